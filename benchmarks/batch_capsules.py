@@ -0,0 +1,101 @@
+#! /usr/bin/env python
+"""Compare querying a NumpyCanvas for the movement capsules of all the
+worms one by one (capsule_collisions) with querying it for all of them
+at once (batch_capsule_collisions), in time and in Python function
+calls per iteration.
+
+The worms paint spirals, with their old circles baked into the trail
+layer like WormSet does, and are queried for their next movements
+along the way.  The results of both are checked to be the same.
+
+Run from the top directory: python benchmarks/batch_capsules.py [worms]
+"""
+
+import os
+import sys
+import math
+import time
+import cProfile
+import pstats
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pyunsrc.NumpyCanvas import NumpyCanvas
+
+AREA_SIZE = 600, 563
+DIAMETER = 6
+BAKE_AGE = 64
+STEP = 2
+STEPS = 1500
+# Queried every this many steps, on the canvas painted until then
+QUERY_INTERVAL = 100
+REPEATS = 20
+
+def spiral(index, worms):
+    """The positions of a worm's spiral path, in its part of the area"""
+    width, height = AREA_SIZE
+    columns = int(math.ceil(math.sqrt(worms)))
+    rows = int(math.ceil(float(worms) / columns))
+    cx = (index % columns + 0.5) * width / columns
+    cy = (index // columns + 0.5) * height / rows
+    max_radius = min(width / columns, height / rows) / 2.0 - DIAMETER
+    angle = 0.0
+    radius = 10.0
+    positions = []
+    for step in xrange(STEPS):
+        angle += STEP / radius
+        radius = min(max_radius, radius + 2.0*DIAMETER*STEP / (2*math.pi*radius))
+        positions.append((cx + radius*math.cos(angle), cy + radius*math.sin(angle)))
+    return positions
+
+def canvases(worms):
+    """Yield the canvas and the capsules of the worms' next movements,
+    every QUERY_INTERVAL steps"""
+    paths = [spiral(index, worms) for index in xrange(worms)]
+    canvas = NumpyCanvas(AREA_SIZE, (DIAMETER*NumpyCanvas.slot_diameters,)*2)
+    recent_ids = [[] for path in paths]
+    for step in xrange(STEPS - 1):
+        for owner, path in enumerate(paths):
+            x, y = path[step]
+            recent_ids[owner].append(canvas.add((int(x), int(y)), DIAMETER, owner, step))
+            if len(recent_ids[owner]) > BAKE_AGE:
+                canvas.bake(recent_ids[owner].pop(0))
+        if step % QUERY_INTERVAL == QUERY_INTERVAL - 1:
+            yield canvas, [(path[step], path[step + 1], DIAMETER + 4) for path in paths]
+
+def one_by_one(canvas, capsules):
+    return [canvas.capsule_collisions(start, end, diameter)
+            for start, end, diameter in capsules]
+
+def batch(canvas, capsules):
+    return canvas.batch_capsule_collisions(capsules)
+
+def measure(query, canvas, capsules):
+    """Return the seconds and Python function calls of the query"""
+    start = time.time()
+    for repeat in xrange(REPEATS):
+        query(canvas, capsules)
+    elapsed = (time.time() - start) / REPEATS
+    profile = cProfile.Profile()
+    profile.runcall(query, canvas, capsules)
+    return elapsed, pstats.Stats(profile).total_calls
+
+def main(args):
+    worms = int(args[0]) if args else 4
+    queries = [('one by one', one_by_one), ('batch', batch)]
+    totals = dict([(name, [0.0, 0]) for name, query in queries])
+    count = 0
+    for canvas, capsules in canvases(worms):
+        assert ([sorted(ids) for ids in batch(canvas, capsules)] ==
+                [sorted(ids) for ids in one_by_one(canvas, capsules)])
+        for name, query in queries:
+            seconds, calls = measure(query, canvas, capsules)
+            totals[name][0] += seconds
+            totals[name][1] += calls
+        count += 1
+    for name, query in queries:
+        seconds, calls = totals[name]
+        print '%-10s %7.1f usec/iteration %6.0f calls/iteration' % (
+            name, seconds / count * 1e6, float(calls) / count)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,44 @@
+#! /usr/bin/env python
+"""Compare the worm steps of the grid canvas engine with those of the
+bitmap one, in time per tick, and check that the worms of both collide
+at the same ticks.
+
+Plays the same rounds (see rounds.py) with each engine.
+
+Run from the top directory: python benchmarks/bitmap_canvas.py [players]
+"""
+
+import sys
+
+import rounds
+from pyunsrc.PlayerController import LEFT, RIGHT
+
+ROUNDS = 10
+# Mostly turning, for longer rounds and denser trails
+KEYS_STATES = (0, LEFT, LEFT, RIGHT)
+
+def play(engine, players):
+    """Return the collisions of the rounds played with the engine"""
+    game_rounds = rounds.setup(engine, players)
+    ticks = 0
+    seconds = 0.0
+    results = []
+    for round in xrange(ROUNDS):
+        rounds.start_round(game_rounds)
+        played = rounds.play_round(game_rounds, KEYS_STATES)
+        ticks += played.ticks
+        seconds += played.seconds
+        results.append(played.collisions)
+    print '%-6s %6d ticks, %5.0f usec/tick' % (engine, ticks, seconds / ticks * 1e6)
+    return results
+
+def main(args):
+    players = int(args[0]) if args else 4
+    grid_results = play('grid', players)
+    bitmap_results = play('bitmap', players)
+    if grid_results != bitmap_results:
+        print 'The engines differ'
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
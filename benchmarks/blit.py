@@ -0,0 +1,94 @@
+#! /usr/bin/env python
+"""Compare the time of blitting the game's kinds of surfaces to the
+display in another pixel format with blitting them converted to the
+display format with util.display_format.
+
+Surfaces created after the display mode is set get its format, but
+rendered fonts, images and surfaces of another depth do not, and the
+display format may be any the video driver chose.  The depth of the
+unconverted surfaces may be given, it is 24 by default, and that of
+the display, the video driver's by default.
+
+display_format keeps the surfaces with alpha as they are on displays
+of less than 24 bits, those are shown as kept.  Fails if a converted
+surface is slower to blit than the unconverted one.
+
+Run from the top directory: python benchmarks/blit.py [depth [display depth]]
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pygame
+from pyunsrc.util import display_format
+
+DISPLAY_MODE = 800, 600
+REPEATS = 200
+# Differences of blit times within this ratio are noise
+NOISE = 1.1
+
+def surfaces(depth):
+    """Return the (name, surface) of an instance of each kind"""
+    worm_area = pygame.Surface((600, 563), pygame.SWSURFACE, depth)
+    worm_area.fill((10, 20, 30))
+    menu = pygame.Surface((450, 420), pygame.SWSURFACE, depth)
+    menu.fill((20, 20, 20))
+    menu.set_alpha(254 * 0.8)
+    disk = pygame.Surface((12, 12), pygame.SWSURFACE, depth)
+    disk.fill((0, 0, 0))
+    pygame.draw.circle(disk, (255, 255, 255), (6, 6), 6)
+    disk.set_colorkey((0, 0, 0), pygame.RLEACCEL)
+    font = pygame.font.SysFont('', 28)
+    text = font.render('Player 1 has been killed!', True, (255, 255, 0))
+    return [('worm area', worm_area), ('menu (alpha)', menu),
+            ('disk (colorkey)', disk), ('text (per pixel alpha)', text)]
+
+def measure(display, surface):
+    # Small surfaces are blitted many times per repeat, like disks
+    count = max(1, display.get_width()*display.get_height() /
+                (surface.get_width()*surface.get_height()*8))
+    positions = [((i*37) % display.get_width(), (i*53) % display.get_height())
+                 for i in xrange(count)]
+    blit = display.blit
+    # The best of the repeats, the others were slowed by something else
+    best = None
+    for i in xrange(REPEATS):
+        start = time.time()
+        for position in positions:
+            blit(surface, position)
+        elapsed = time.time() - start
+        if best is None or elapsed < best:
+            best = elapsed
+    return best / count * 1e6
+
+def main(args):
+    depth = 24
+    display_depth = 0
+    if args:
+        depth = int(args[0])
+    if args[1:]:
+        display_depth = int(args[1])
+    pygame.init()
+    display = pygame.display.set_mode(DISPLAY_MODE, 0, display_depth)
+    print 'display: %d bits, %d bit surfaces' % (display.get_bitsize(), depth)
+    slower = False
+    for name, surface in surfaces(depth):
+        converted = display_format(surface)
+        if converted is surface:
+            print '%-24s %8.1f usec/blit kept' % (name, measure(display, surface))
+            continue
+        unconverted_time = measure(display, surface)
+        converted_time = measure(display, converted)
+        print '%-24s %8.1f usec/blit unconverted %8.1f usec/blit converted (x%.1f)' % (
+            name, unconverted_time, converted_time, unconverted_time / converted_time)
+        if converted_time > unconverted_time * NOISE:
+            slower = True
+    if slower:
+        print 'Converting made blitting slower at a %d bit display' % (display.get_bitsize(),)
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
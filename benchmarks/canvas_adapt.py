@@ -0,0 +1,54 @@
+#! /usr/bin/env python
+"""Check that the canvas adapts its slot size between normal rounds,
+and never in the middle of one.
+
+Plays rounds (see rounds.py) with the slot canvas engines, and shows
+the slot size each round started with (the one Canvas.adapt chose by
+the queries of the previous round) along with the time per tick.
+Fails if a round did not start with adapting the slots, or if they
+were adapted during a round.
+
+The bitmap engine answers the worms' queries from its pixel map
+rather than from its slots, so it has nothing to adapt to.
+
+Run from the top directory: python benchmarks/canvas_adapt.py [players]
+"""
+
+import sys
+
+import rounds
+from pyunsrc.WormArea import NumpyCanvas
+
+ROUNDS = 5
+
+def check(engine, players):
+    game_rounds = rounds.setup(engine, players)
+    ok = True
+    for round in xrange(ROUNDS):
+        worm_area = game_rounds.worm_area
+        adaptations = worm_area.canvas.adaptations
+        rounds.start_round(game_rounds)
+        start_adaptations = worm_area.canvas.adaptations - adaptations
+        canvas = worm_area.canvas
+        adaptations = canvas.adaptations
+        played = rounds.play_round(game_rounds)
+        print '%-6s round %d: %5d ticks %6d circles, slots %r, %5.0f usec/tick' % (
+            engine, round, played.ticks, played.circles, canvas.slot_size,
+            played.seconds / played.ticks * 1e6)
+        # The first round has no previous one to adapt to
+        if canvas.adaptations != adaptations or (round > 0 and not start_adaptations):
+            ok = False
+    return ok
+
+def main(args):
+    players = int(args[0]) if args else 4
+    engines = ['grid']
+    if NumpyCanvas is not None:
+        engines.append('numpy')
+    results = [check(engine, players) for engine in engines]
+    if not all(results):
+        print 'The slots were not adapted between rounds, or were during one'
+        sys.exit(1)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
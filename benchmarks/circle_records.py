@@ -0,0 +1,136 @@
+#! /usr/bin/env python
+"""Compare the memory per circle and time per worm step of the
+Canvas circle records with the old layout (a Circle object with a
+weakref to its worm per step, a Rect per slot it is in, and two sets
+built per step to skip the worm's own fresh trail).
+
+Run from the top directory: python benchmarks/circle_records.py
+"""
+
+import os
+import sys
+import gc
+import time
+import math
+import types
+import weakref
+from sets import Set as set
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pygame import Rect
+from pyunsrc import Canvas
+
+AREA_SIZE = 600, 563
+DIAMETER = 6
+SLOT_LENGTH = DIAMETER*4
+STEP = 2
+STEPS = 8000
+
+class OldCircle(object):
+    def __init__(self, worm, position, diameter):
+        self.worm = weakref.ref(worm)
+        self.position = position
+        self.diameter = diameter
+    def bounding_rect(self):
+        x, y = self.position
+        return Rect((x - self.diameter/2, y - self.diameter/2),
+                    (self.diameter, self.diameter))
+    def collides_with(self, other):
+        sqr_diameter = ((self.diameter + other.diameter) / 2)**2
+        x1, y1 = self.position
+        x2, y2 = other.position
+        return (x1-x2)**2 + (y1-y2)**2 <= sqr_diameter
+
+class OldCanvas(object):
+    def __init__(self, slot_size):
+        self.slot_size = slot_size
+        self._rects_of_slot = {}
+        self._slots_of_entry = {}
+    def _slot_keys_of_rect(self, rect):
+        slot_width, slot_height = self.slot_size
+        for x in xrange(rect.left//slot_width, 1+rect.right//slot_width):
+            for y in xrange(rect.top//slot_height, 1+rect.bottom//slot_height):
+                yield x, y
+    def add(self, entry):
+        rect = entry.bounding_rect()
+        self._slots_of_entry[entry] = slots = []
+        for slot_key in self._slot_keys_of_rect(rect):
+            self._rects_of_slot.setdefault(slot_key, {})[entry] = rect
+            slots.append(slot_key)
+    def collisions(self, entry):
+        rect = entry.bounding_rect()
+        for slot_key in self._slot_keys_of_rect(rect):
+            for other_entry, cur_rect in self._rects_of_slot.get(slot_key, {}).iteritems():
+                if rect.colliderect(cur_rect) and entry.collides_with(other_entry):
+                    yield other_entry
+
+class Worm(object):
+    pass
+
+def trail():
+    """A spiral worm path that never touches itself"""
+    x, y = AREA_SIZE[0]/2.0, AREA_SIZE[1]/2.0
+    angle = 0.0
+    radius = 10.0
+    for i in xrange(STEPS):
+        angle += STEP / radius
+        radius += 2.0*DIAMETER*STEP / (2*math.pi*radius)
+        yield (int(x + radius*math.cos(angle)), int(y + radius*math.sin(angle)))
+
+def deep_size(root):
+    seen = set()
+    pending = [root]
+    size = 0
+    while pending:
+        obj = pending.pop()
+        if id(obj) in seen or isinstance(obj, (type, types.ModuleType, types.FunctionType)):
+            continue
+        seen.add(id(obj))
+        size += sys.getsizeof(obj)
+        pending.extend(gc.get_referents(obj))
+    return size
+
+def old_steps(positions):
+    worm = Worm()
+    canvas = OldCanvas((SLOT_LENGTH, SLOT_LENGTH))
+    last_collisions = set()
+    for position in positions:
+        circle = OldCircle(worm, position, DIAMETER)
+        canvas.add(circle)
+        new_collisions = set(canvas.collisions(circle))
+        assert not new_collisions - last_collisions - set([circle])
+        last_collisions = new_collisions
+    return canvas
+
+def new_steps(positions):
+    canvas = Canvas.Canvas(AREA_SIZE, (SLOT_LENGTH, SLOT_LENGTH))
+    owner = 0
+    fresh_seq = 0
+    for seq, position in enumerate(positions):
+        canvas.add(position, DIAMETER, owner, seq)
+        new_fresh_seq = seq + 1
+        for circle_id in canvas.collisions(position, DIAMETER):
+            circle_seq = canvas.seq(circle_id)
+            assert canvas.owner(circle_id) == owner and circle_seq >= fresh_seq
+            new_fresh_seq = min(new_fresh_seq, circle_seq)
+        fresh_seq = new_fresh_seq
+    return canvas
+
+def measure(name, steps, positions):
+    gc.collect()
+    objects_before = len(gc.get_objects())
+    start = time.clock()
+    canvas = steps(positions)
+    elapsed = time.clock() - start
+    objects = len(gc.get_objects()) - objects_before
+    print '%-8s %7.1f bytes/circle %6.2f tracked objects/circle %6.1f usec/step' % (
+        name, float(deep_size(canvas)) / len(positions),
+        float(objects) / len(positions), elapsed / len(positions) * 1e6)
+
+def main():
+    positions = list(trail())
+    measure('old', old_steps, positions)
+    measure('records', new_steps, positions)
+
+if __name__ == '__main__':
+    main()
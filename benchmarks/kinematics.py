@@ -0,0 +1,60 @@
+#! /usr/bin/env python
+"""Compare the floating point and the fixed point (FIXED_POINT_KINEMATICS)
+kinematics of a WormSet, in time per tick of steering the worms and
+computing the steps of their movements.
+
+Whole games are no fair comparison of them, as the worms of each mode
+take different paths, and live for different numbers of moves.  Here
+both steer the same keys, at the same speeds, for the same ticks.
+
+Run from the top directory: python benchmarks/kinematics.py [worms]
+"""
+
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+from pyunsrc import configfile
+from pyunsrc.Bunch import Bunch
+from pyunsrc.DictAttrAccessor import DictAttrAccessor
+from pyunsrc.PlayerController import LEFT, RIGHT
+from pyunsrc.WormSet import WormSet
+from pyunsrc.util import random_of
+
+TICKS = 20000
+REPEATS = 3
+
+def measure(fixed, worms):
+    """Return the seconds per tick"""
+    net_config = DictAttrAccessor(configfile.default_net_config.copy())
+    net_config.FIXED_POINT_KINEMATICS = fixed
+    worm_area = Bunch(add_owner=lambda color: 0)
+    worm_set = WormSet((600, 563), net_config, worm_area)
+    random = random_of(1)
+    indexes = [worm_set.add(lambda: random, (255, 255, 255)).index
+               for worm in xrange(worms)]
+    for index in indexes:
+        worm_set.reset(index, (100 + 50*index, 300))
+    keys_states = [[[0, LEFT, RIGHT][random.randrange(3)] for index in indexes]
+                   for tick in xrange(TICKS)]
+    speed = float(net_config.INITIAL_SPEED) / net_config.GAME_ITERATIONS_PER_SECOND
+    best = None
+    for repeat in xrange(REPEATS):
+        start = time.time()
+        for tick_keys_states in keys_states:
+            worm_set.steer(indexes, tick_keys_states)
+            worm_set._steps_of_worms(indexes, speed)
+        elapsed = (time.time() - start) / TICKS
+        if best is None or elapsed < best:
+            best = elapsed
+    return best
+
+def main(args):
+    worms = int(args[0]) if args else 4
+    for name, fixed in [('float', False), ('fixed', True)]:
+        seconds = measure(fixed, worms)
+        print '%-5s %6.1f usec/tick' % (name, seconds * 1e6)
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -0,0 +1,85 @@
+"""Rounds of randomly steered worms on a WormArea, without a Game, for
+the canvas benchmarks.
+
+The worms' random generators are split from a single seeded one, so
+the rounds played with each canvas engine are the same as long as the
+engines agree on the collisions.
+"""
+
+import os
+import sys
+import time
+
+os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+import pygame
+from pyunsrc import configfile
+from pyunsrc.configfile import config
+from pyunsrc.Bunch import Bunch
+from pyunsrc.DictAttrAccessor import DictAttrAccessor
+from pyunsrc.PlayerController import LEFT, RIGHT
+from pyunsrc.WormArea import WormArea
+from pyunsrc.WormSet import WormSet
+from pyunsrc.util import random_of
+
+MAX_TICKS = 5000
+COLORS = [(255, 0, 0), (0, 255, 0), (0, 0, 255), (255, 255, 0),
+          (255, 0, 255), (0, 255, 255), (255, 128, 0), (128, 128, 255)]
+# The keys states the worms switch to, at random
+KEYS_STATES = (0, LEFT, RIGHT)
+
+def setup(engine, players):
+    """Return a Bunch of the worm_area (of the canvas engine), worm_set,
+    worms and random generator of the rounds"""
+    config.CANVAS_ENGINE = engine
+    net_config = DictAttrAccessor(configfile.default_net_config.copy())
+    game = Bunch(net_config=net_config)
+    worm_area = WormArea(game, pygame.Surface(config.WORM_AREA_SIZE, pygame.SWSURFACE))
+    worm_set = WormSet(worm_area.arena_size, net_config, worm_area)
+    random = random_of(1)
+    worms = []
+    for index in xrange(players):
+        worm_random = random.split()
+        worms.append(worm_set.add(lambda worm_random=worm_random: worm_random,
+                                  COLORS[index % len(COLORS)]))
+    return Bunch(worm_area=worm_area, worm_set=worm_set, worms=worms, random=random)
+
+def start_round(rounds):
+    """Clear the worm area and put the worms at random positions"""
+    width, height = rounds.worm_area.arena_size
+    outline_width = config.POS_RANDOM_OUTLINE_WIDTH
+    rounds.worm_area.clear()
+    for worm in rounds.worms:
+        worm.reset((rounds.random.randrange(outline_width, width - outline_width),
+                    rounds.random.randrange(outline_width, height - outline_width)))
+
+def play_round(rounds, keys_states=KEYS_STATES):
+    """Play a started round until at most one worm lives, switching the
+    worms to random ones of the keys_states, and return a Bunch of its
+    ticks, circles added, (tick, index) of each collision and the
+    seconds of steering and moving the worms"""
+    worm_set = rounds.worm_set
+    random = rounds.random
+    net_config = worm_set.net_config
+    speed = float(net_config.INITIAL_SPEED) / net_config.GAME_ITERATIONS_PER_SECOND
+    living = [worm.index for worm in rounds.worms]
+    worm_keys_states = [0] * len(rounds.worms)
+    collisions = []
+    tick = circles = 0
+    seconds = 0.0
+    while len(living) > 1 and tick < MAX_TICKS:
+        for index in living:
+            if random.randrange(10) == 0:
+                worm_keys_states[index] = keys_states[random.randrange(len(keys_states))]
+        start = time.time()
+        worm_set.steer(living, [worm_keys_states[index] for index in living])
+        collided = worm_set.forward(living, speed)
+        seconds += time.time() - start
+        for index in collided:
+            living.remove(index)
+            collisions.append((tick, index))
+        for worm in rounds.worms:
+            circles += len(worm.circles_to_draw)
+            worm.discard_drawing()
+        tick += 1
+    return Bunch(ticks=tick, circles=circles, collisions=collisions, seconds=seconds)
@@ -1,10 +1,15 @@
 #! /usr/bin/env python
 
+import os
 import sys
 import pygame
 from pyunsrc.Game import Game
+from pyunsrc.RenderProcess import RenderProcess
+from pyunsrc.configfile import config
 
 DEFAULT_PORT = 10002
+DEFAULT_BENCHMARK_PLAYERS = 4
+DEFAULT_BENCHMARK_TICKS = 5000
 
 def usage():
     print "Usage: pyun.py myname -c hostname[:port]  Network mode, connect to"
@@ -13,6 +18,18 @@ def usage():
     print "   or: pyun.py myname -l [port]           Network mode, become host of game"
     print
     print "   or: pyun.py                            Local play"
+    print
+    print "   or: pyun.py -benchmark[:players[:ticks[:N]]]"
+    print "                                          Local play of scripted players"
+    print "                                          (%d by default), as fast as it" % (
+        DEFAULT_BENCHMARK_PLAYERS,)
+    print "                                          goes, exiting after the ticks"
+    print "                                          (%d by default) with their rate" % (
+        DEFAULT_BENCHMARK_TICKS,)
+    print
+    print "The network modes may be preceded by -headless[:N] to run without"
+    print "a window (e.g. as a dedicated peer).  Both it and -benchmark render"
+    print "offscreen every Nth frame if N is given."
     sys.exit()
 
 def cmd_int(x):
@@ -44,14 +61,54 @@ def get_cmdline(args):
             port = cmd_int(args[2])
         return 'listen', args[0], port
 
+def get_headless(args):
+    """Remove the -headless[:N] or -benchmark[:players[:ticks[:N]]]
+    option from the args and return (headless, render_interval,
+    benchmark), the benchmark being the (players, ticks) if any"""
+    if args and args[0].startswith('-headless'):
+        option = args.pop(0)
+        if option == '-headless':
+            return True, 0, None
+        if not option.startswith('-headless:'):
+            usage()
+        return True, cmd_int(option.split(':', 1)[1]), None
+    if args and args[0].startswith('-benchmark'):
+        values = args.pop(0).split(':')
+        if values[0] != '-benchmark' or len(values) > 4:
+            usage()
+        values = map(cmd_int, values[1:])
+        defaults = [DEFAULT_BENCHMARK_PLAYERS, DEFAULT_BENCHMARK_TICKS, 0]
+        players, ticks, render_interval = values + defaults[len(values):]
+        if players < 2:
+            usage()
+        return True, render_interval, (players, ticks)
+    return False, 0, None
+
 def main(args):
+    args = list(args)
+    headless, render_interval, benchmark = get_headless(args)
     cmdline = get_cmdline(args)
+    if benchmark is not None and cmdline[0] != 'local':
+        # Network peers keep the pace of the game
+        usage()
+    if headless and benchmark is None and cmdline[0] == 'local':
+        # Nobody could create the players
+        usage()
+    render_process = None
+    if config.RENDER_PROCESS and not headless:
+        # Started before pygame is initialized, to own the window
+        render_process = RenderProcess()
+        os.environ['SDL_VIDEODRIVER'] = 'dummy'
+    if headless:
+        # Events still need a video driver
+        os.environ.setdefault('SDL_VIDEODRIVER', 'dummy')
     pygame.init()
-    game = Game(cmdline)
+    game = Game(cmdline, headless, render_interval, render_process, benchmark)
     game.run()
+    if render_process is not None:
+        render_process.close()
     # pygame.quit()
     # sys.exit()
-    import os
     os._exit(0)
 
 if __name__ == '__main__':
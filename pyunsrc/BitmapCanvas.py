@@ -0,0 +1,172 @@
+from array import array
+import Canvas
+
+# Queries reaching further than this are answered by the grid
+MAX_MASK_REACH = 24
+
+# The owner + 1 of a pixel holding the centers of circles of several
+# owners, which collide with every worm
+MIXED = 255
+# The seq of a pixel whose circles were baked, older than any circle
+# a worm may touch
+BAKED = -1
+
+class BitmapCanvas(Canvas.Canvas):
+    """A Canvas that rasterizes the center of each of its circles into
+    area-sized maps of the owner + 1 (0 for none), the lowest seq and
+    the largest diameter of the circles centered at each pixel.
+
+    The collision test of a worm step (own_collision_seq) walks the
+    rows of a precomputed disk mask around its position in the maps,
+    and stops at the first pixel it collides with, so its cost does
+    not depend on how many circles are in the canvas.  The pixels are
+    tested like in Canvas.overlapping.
+
+    Baked circles keep their pixels, with the BAKED seq, so the worm
+    steps never go through the TrailLayer.  The grid is only built by
+    the first of the other queries (the fog vision), and painting the
+    trail goes over the live records, which baking keeps few.
+
+    A pixel shared by the circles of several owners collides with
+    every worm, as all of them are of the same diameter.  Once circles
+    of another diameter are added (the diameter changed in the round),
+    the maps can no longer tell which of them a worm touches, so the
+    steps are tested on the circles of the grid and the TrailLayer like
+    in Canvas until the canvas is cleared.  The results are always those
+    of Canvas, as the peers of a game may use different engines.
+    """
+    # The grid is only used for large queries (the fog vision)
+    slot_diameters = 8
+    capsule_queries = False
+
+    def __init__(self, size, slot_size):
+        self.width, self.height = size
+        self._masks = {}
+        super(BitmapCanvas, self).__init__(size, slot_size)
+
+    def clear(self):
+        pixel_count = self.width*self.height
+        self._owner_of_pixel = bytearray(pixel_count)
+        self._seq_of_pixel = array('i', [0]) * pixel_count
+        self._diameter_of_pixel = array('H', [0]) * pixel_count
+        # The diameter of all the circles, None before the first one
+        # and 0 once there are several
+        self._diameter = None
+        super(BitmapCanvas, self).clear()
+
+    def _clear_index(self):
+        # Built by the first query that needs it
+        self._ids_of_slot = None
+
+    def _grid(self):
+        if self._ids_of_slot is None:
+            self._ids_of_slot = {}
+            for circle_id in self._live_items():
+                x, y = self.position(circle_id)
+                super(BitmapCanvas, self)._index(circle_id, x, y)
+        return self._ids_of_slot
+
+    def reindex(self, slot_size):
+        # The maps do not depend on the slots
+        self.slot_size = slot_size
+        self._clear_index()
+        self._reset_stats()
+
+    def _index(self, circle_id, x, y):
+        if self._ids_of_slot is not None:
+            super(BitmapCanvas, self)._index(circle_id, x, y)
+        if self._diameter is None:
+            self._diameter = self._diameters[circle_id]
+        elif self._diameter != self._diameters[circle_id]:
+            self._diameter = 0
+        pixel = y*self.width + x
+        owner = self._owners[circle_id] + 1
+        assert owner < MIXED
+        seq = self._seqs[circle_id]
+        pixel_owner = self._owner_of_pixel[pixel]
+        if not pixel_owner:
+            self._owner_of_pixel[pixel] = owner
+            self._seq_of_pixel[pixel] = seq
+        elif pixel_owner != owner:
+            self._owner_of_pixel[pixel] = MIXED
+        else:
+            self._seq_of_pixel[pixel] = min(self._seq_of_pixel[pixel], seq)
+        self._diameter_of_pixel[pixel] = max(self._diameter_of_pixel[pixel],
+                                             self._diameters[circle_id])
+
+    def _unindex(self, circle_id, x, y):
+        # Only baked circles are removed, they keep colliding from the
+        # maps.  Their seq is lower than that of any live circle of the
+        # owner, so it is the lowest of the pixel.
+        if self._ids_of_slot is not None:
+            super(BitmapCanvas, self)._unindex(circle_id, x, y)
+        self._seq_of_pixel[y*self.width + x] = BAKED
+
+    def _candidates(self, slot_keys):
+        self._grid()
+        return super(BitmapCanvas, self)._candidates(slot_keys)
+
+    def _live_in_rect(self, rect):
+        return [circle_id for circle_id in self._live_items()
+                if self._bounding_rect(circle_id).colliderect(rect)]
+
+    def _mask(self, diameter):
+        """Return the reach and the half-width of each row of the disk
+        containing all the centers a circle of the given diameter may
+        collide with."""
+        key = diameter, self._max_diameter
+        if key not in self._masks:
+            reach = (diameter + self._max_diameter)//2
+            half_widths = []
+            for dy in xrange(-reach, reach+1):
+                half_width = 0
+                while (half_width+1)**2 + dy**2 <= reach**2:
+                    half_width += 1
+                half_widths.append(half_width)
+            self._masks[key] = reach, half_widths
+        return self._masks[key]
+
+    def own_collision_seq(self, position, diameter, owner, fresh_seq, old_fresh_seq,
+                          candidates):
+        reach, half_widths = self._mask(diameter)
+        if reach > MAX_MASK_REACH or self._diameter == 0:
+            return super(BitmapCanvas, self).own_collision_seq(
+                position, diameter, owner, fresh_seq, old_fresh_seq,
+                self.collisions(position, diameter))
+        owner_of_pixel = self._owner_of_pixel
+        seq_of_pixel = self._seq_of_pixel
+        diameter_of_pixel = self._diameter_of_pixel
+        width = self.width
+        owner += 1
+        x, y = position
+        left = x - diameter/2
+        top = y - diameter/2
+        for row_y, half_width in zip(xrange(y - reach, y + reach + 1), half_widths):
+            if not 0 <= row_y < self.height:
+                continue
+            row = row_y*width
+            start = row + max(0, x - half_width)
+            end = row + min(width, x + half_width + 1)
+            # Counting does not copy the row, most are empty
+            if owner_of_pixel.count('\0', start, end) == end - start:
+                continue
+            for pixel in xrange(start, end):
+                pixel_owner = owner_of_pixel[pixel]
+                if not pixel_owner:
+                    continue
+                other_x = pixel - row
+                other_diameter = diameter_of_pixel[pixel]
+                other_left = other_x - other_diameter/2
+                other_top = row_y - other_diameter/2
+                if not (left < other_left + other_diameter and
+                        other_left < left + diameter and
+                        top < other_top + other_diameter and
+                        other_top < top + diameter and
+                        (x-other_x)**2 + (y-row_y)**2 <=
+                        ((diameter + other_diameter) / 2)**2):
+                    continue
+                seq = seq_of_pixel[pixel]
+                if pixel_owner != owner or seq < old_fresh_seq:
+                    return None
+                fresh_seq = min(fresh_seq, seq)
+        return fresh_seq
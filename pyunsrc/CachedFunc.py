@@ -1,11 +1,58 @@
 from cPickle import dumps
+from collections import OrderedDict
 
 class CachedFunc(object):
-    def __init__(self, func):
+    """Memoizes a function.
+
+    The results are keyed by key(*args, **kw) if a key function is
+    given, and otherwise by the arguments themselves when they are
+    hashable, or by their pickle.  With a max_size, the least recently
+    used results are evicted to keep at most that many.
+
+    The hits, misses and evictions are counted.
+    """
+    def __init__(self, func, max_size=None, key=None):
         self._func = func
-        self._cache = {}
+        self._key_func = key
+        self.max_size = max_size
+        if max_size is None:
+            # The order is only needed for evicting
+            self._cache = {}
+        else:
+            self._cache = OrderedDict()
+        self.hits = self.misses = self.evictions = 0
+
+    def _key(self, args, kw):
+        if self._key_func is not None:
+            return self._key_func(*args, **kw)
+        key = args
+        if kw:
+            key = args, tuple(sorted(kw.items()))
+        try:
+            hash(key)
+        except TypeError:
+            return dumps((args, sorted(kw.items())), -1)
+        return key
+
     def __call__(self, *args, **kw):
-        key = dumps((args, kw.items()), -1)
-        if key not in self._cache:
-            self._cache[key] = self._func(*args, **kw)
-        return self._cache[key]
+        key = self._key(args, kw)
+        cache = self._cache
+        if key in cache:
+            self.hits += 1
+            if self.max_size is None:
+                return cache[key]
+            result = cache.pop(key)
+        else:
+            self.misses += 1
+            result = self._func(*args, **kw)
+            if self.max_size is not None and len(cache) >= self.max_size:
+                cache.popitem(last=False)
+                self.evictions += 1
+        cache[key] = result
+        return result
+
+    def __len__(self):
+        return len(self._cache)
+
+    def clear(self):
+        self._cache.clear()
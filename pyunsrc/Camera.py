@@ -0,0 +1,68 @@
+from pygame import Rect
+from configfile import config
+
+class Camera(object):
+    """Maps the arena to the view of it.
+
+    In the 'follow' mode, the view shows a view-sized rect of the
+    arena, which recenters on the followed position when it gets
+    within CAMERA_MARGIN of the view's edges.  In the 'fit' mode, the
+    view shows all of the arena, scaled down by the smallest integer
+    factor that fits it.
+    """
+    def __init__(self, arena_size, view_size, mode):
+        self.arena_rect = Rect((0, 0), arena_size)
+        arena_width, arena_height = arena_size
+        view_width, view_height = view_size
+        if mode == 'fit':
+            self.scale = max(1, -(-arena_width // view_width), -(-arena_height // view_height))
+            self.rect = self.arena_rect.copy()
+        else:
+            assert mode == 'follow', "Unknown camera mode %r" % (mode,)
+            self.scale = 1
+            self.rect = Rect((0, 0), (min(arena_width, view_width),
+                                      min(arena_height, view_height)))
+            self.rect.center = self.arena_rect.center
+            self.rect.clamp_ip(self.arena_rect)
+
+    def follow(self, (x, y)):
+        """Recenter the view on the position if it is too near its
+        edges, and return whether it moved"""
+        margin_width = int(self.rect.width * config.CAMERA_MARGIN)
+        margin_height = int(self.rect.height * config.CAMERA_MARGIN)
+        if self.rect.inflate(-2*margin_width, -2*margin_height).collidepoint(x, y):
+            return False
+        rect = self.rect.copy()
+        rect.center = int(x), int(y)
+        rect.clamp_ip(self.arena_rect)
+        if rect == self.rect:
+            return False
+        self.rect = rect
+        return True
+
+    def to_view(self, (x, y)):
+        return (int(x) - self.rect.left) // self.scale, (int(y) - self.rect.top) // self.scale
+
+    def positions_to_view(self, positions):
+        """Map integer positions to the view"""
+        if self.scale == 1 and self.rect.topleft == (0, 0):
+            return positions
+        return [self.to_view(position) for position in positions]
+
+    def diameter_to_view(self, diameter):
+        if self.scale == 1:
+            return diameter
+        # Stamps need a radius
+        return max(2, diameter // self.scale)
+
+    def rect_to_view(self, rect):
+        """Return the view rect covering the arena rect"""
+        left, top = self.to_view(rect.topleft)
+        right = -(-(rect.right - self.rect.left) // self.scale)
+        bottom = -(-(rect.bottom - self.rect.top) // self.scale)
+        return Rect((left, top), (right - left, bottom - top))
+
+    def rect_to_arena(self, rect):
+        """Return the arena rect the view rect shows"""
+        return Rect((rect.left*self.scale + self.rect.left, rect.top*self.scale + self.rect.top),
+                    (rect.width*self.scale, rect.height*self.scale))
@@ -1,78 +1,360 @@
+import math
+from array import array
 from pygame import Rect
+from TrailLayer import TrailLayer
+from util import sqr_distance_to_segment, capsule_rect
 
 class Error(Exception): pass
-class EntryAlreadyExists(Error): pass
-
-
-class Object(object):
-    def __init__(self):
-        super(Object, self).__init__()
-    def bounding_rect(self):
-        raise NotImplementedError()
-
-class Circle(Object):
-    def __init__(self, position, diameter):
-        super(Object, self).__init__()
-        self.position = position
-        self.diameter = diameter
-    def bounding_rect(self):
-        x, y = self.position
-        return Rect((x - self.diameter/2, y - self.diameter/2),
-                    (self.diameter, self.diameter))
-    def collides_with(self, other):
-        assert isinstance(other, Circle)
-        sqr_diameter = ((self.diameter + other.diameter) / 2)**2
-        x1, y1 = self.position
-        x2, y2 = other.position
-        return (x1-x2)**2 + (y1-y2)**2 <= sqr_diameter
+
+# The owner of the free (removed) circle ids
+FREE = -1
+
+def pack_position((x, y)):
+    return y << 16 | x
+
+def unpack_position(packed):
+    return packed & 0xFFFF, packed >> 16
 
 class Canvas(object):
+    """A grid of slots indexing circles of integer positions and
+    diameters.
+
+    Each circle is a compact record (packed position, diameter, owner
+    index and the owner's sequence number of the circle) in parallel
+    arrays, identified by its integer index in them.  A circle is kept
+    only in the slot of its center.
+
+    Two circles collide if their bounding rects overlap and their
+    centers are no further apart than the average of their diameters.
+
+    The canvas counts the slots and candidates its queries go through,
+    so that adapt() can re-index it with the slot size its cost model
+    expects to be cheapest.  Re-indexing goes over all the circles, so
+    the WormArea only adapts the canvas between rounds and when the
+    diameter changes, never in the middle of a tick.
+
+    Circles that no longer need their identity can be baked into a
+    TrailLayer, which keeps them colliding in memory bounded by the
+    area size, and frees their records and slot entries.
+    """
+    # The suggested slot length, in circle diameters
+    slot_diameters = 4
+    # The slot lengths adapt() chooses from, in circle diameters
+    slot_diameters_choices = (2, 3, 4, 6, 8, 12, 16, 24, 32)
+    # The relative costs of visiting a slot and of testing a candidate
+    slot_cost = 3.0
+    candidate_cost = 1.0
+    # Whether batch_capsule_collisions answers the capsules at once,
+    # rather than one by one
+    batch_queries = False
+    # Whether own_collision_seq tests the candidates of capsule queries,
+    # rather than finding the circles by itself
+    capsule_queries = True
+
     def __init__(self, size, slot_size):
         self.area_rect = Rect((0,0), size)
         self.slot_size = slot_size
-        self._rects_of_slot = {}
-        self._slots_of_entry = {}
+        # The number of times adapt() found a suggested slot size
+        self.adaptations = 0
+        self.clear()
+
+    def clear(self):
+        self._positions = array('i')
+        self._diameters = array('i')
+        self._owners = array('i')
+        self._seqs = array('i')
+        self._free_ids = []
+        self._max_diameter = 0
+        self._trail = TrailLayer(self.area_rect.size)
+        # The ids of the circles added since the last batch query
+        self._batch_added_ids = None
+        self._clear_index()
+        self._reset_stats()
+
+    def _clear_index(self):
+        self._ids_of_slot = {}
+
+    def _reset_stats(self):
+        self._query_count = 0
+        self._slot_visit_count = 0
+        self._candidate_count = 0
+        self._trail.reset_stats()
+
+    def position(self, circle_id):
+        if circle_id < 0:
+            return self._trail.position(circle_id)
+        return unpack_position(self._positions[circle_id])
+
+    def diameter(self, circle_id):
+        if circle_id < 0:
+            return self._trail.diameter(circle_id)
+        return self._diameters[circle_id]
+
+    def owner(self, circle_id):
+        if circle_id < 0:
+            return self._trail.owner(circle_id)
+        return self._owners[circle_id]
+
+    def seq(self, circle_id):
+        """The owner's sequence number of the circle, -1 for circles
+        baked into the trail"""
+        if circle_id < 0:
+            return -1
+        return self._seqs[circle_id]
+
+    def _slot_key(self, x, y):
+        slot_width, slot_height = self.slot_size
+        return x//slot_width, y//slot_height
 
     def _slot_keys_of_rect(self, rect):
         slot_width, slot_height = self.slot_size
         for x in xrange(rect.left//slot_width, 1+rect.right//slot_width):
             for y in xrange(rect.top//slot_height, 1+rect.bottom//slot_height):
                 yield x, y
-        
-    def _add(self, rect, entry):
-        if entry in self._slots_of_entry:
-            raise EntryAlreadyExists("Entry already in Canvas")
-        assert entry not in self._slots_of_entry
-        
-        assert self.area_rect.contains(rect)
-
-        self._slots_of_entry[entry] = slots = []
-        for slot_key in self._slot_keys_of_rect(rect):
-            self._rects_of_slot.setdefault(slot_key, {})[entry] = rect
-            slots.append(slot_key)
-
-    def add(self, entry):
-        self._add(entry.bounding_rect(), entry)
-
-    def remove(self, entry):
-        for slot_key in self._slots_of_entry[entry]:
-            del self._rects_of_slot[slot_key][entry]
-        del self._slots_of_entry[entry]
 
-    def clear(self):
-        self._rects_of_slot.clear()
-        self._slots_of_entry.clear()
-
-    def _rect_collisions(self, rect):
-        for slot_key in self._slot_keys_of_rect(rect):
-            for entry, cur_rect in self._rects_of_slot.get(slot_key, {}).iteritems():
-                if rect.colliderect(cur_rect):
-                    yield entry
-    
-    def collisions(self, entry):
-        for other_entry in self._rect_collisions(entry.bounding_rect()):
-            if entry.collides_with(other_entry):
-                yield other_entry
+    def _slot_keys_of_reach(self, (x, y), reach):
+        """The keys of the slots of all the centers within reach"""
+        slot_width, slot_height = self.slot_size
+        for slot_x in xrange((x - reach)//slot_width, 1+(x + reach)//slot_width):
+            for slot_y in xrange((y - reach)//slot_height, 1+(y + reach)//slot_height):
+                yield slot_x, slot_y
+
+    def add(self, position, diameter, owner, seq):
+        """Add a circle and return its id"""
+        x, y = position
+        assert self.area_rect.contains(Rect((x - diameter/2, y - diameter/2),
+                                            (diameter, diameter)))
+        if self._free_ids:
+            circle_id = self._free_ids.pop()
+            self._positions[circle_id] = pack_position(position)
+            self._diameters[circle_id] = diameter
+            self._owners[circle_id] = owner
+            self._seqs[circle_id] = seq
+        else:
+            circle_id = len(self._owners)
+            self._positions.append(pack_position(position))
+            self._diameters.append(diameter)
+            self._owners.append(owner)
+            self._seqs.append(seq)
+        self._max_diameter = max(self._max_diameter, diameter)
+        self._index(circle_id, x, y)
+        if self._batch_added_ids is not None:
+            self._batch_added_ids.append(circle_id)
+        return circle_id
+
+    def _index(self, circle_id, x, y):
+        slot_key = self._slot_key(x, y)
+        slot_ids = self._ids_of_slot.get(slot_key)
+        if slot_ids is None:
+            slot_ids = self._ids_of_slot[slot_key] = array('i')
+        slot_ids.append(circle_id)
+
+    def remove(self, circle_id):
+        x, y = self.position(circle_id)
+        self._unindex(circle_id, x, y)
+        self._owners[circle_id] = FREE
+        self._free_ids.append(circle_id)
+
+    def _unindex(self, circle_id, x, y):
+        self._ids_of_slot[self._slot_key(x, y)].remove(circle_id)
+
+    def bake(self, circle_id):
+        """Move a circle into the trail layer, its id may be reused by
+        the next circles added"""
+        self._trail.add(self.position(circle_id), self._diameters[circle_id],
+                        self._owners[circle_id])
+        self.remove(circle_id)
+
+    def _live_items(self):
+        return [circle_id for circle_id, owner in enumerate(self._owners)
+                if owner != FREE]
 
     def items(self):
-        return self._slots_of_entry.iterkeys()
+        return self._live_items() + self._trail.items()
+
+    def records(self):
+        """Return the arrays of the packed positions, diameters and
+        owners of the circle records, including FREE ones"""
+        return self._positions, self._diameters, self._owners
+
+    def trail_layers(self):
+        return self._trail.layers()
+
+    def reindex(self, slot_size):
+        self.slot_size = slot_size
+        self._clear_index()
+        for circle_id in self._live_items():
+            x, y = self.position(circle_id)
+            self._index(circle_id, x, y)
+        self._reset_stats()
+
+    def suggested_slot_size(self, diameter=0):
+        """Return the slot size expected to make the queries made since
+        the last re-index cheapest, or None if there were none.  The
+        diameter of the circles to be added may be given."""
+        max_diameter = max(self._max_diameter, diameter)
+        if not self._slot_visit_count or not max_diameter:
+            return None
+        slot_length = self.slot_size[0]
+        slots_per_query = float(self._slot_visit_count) / self._query_count
+        # The baked circles the queries went through count too, so that
+        # the density does not depend on how many of the circles around
+        # the queries are still in the slots
+        candidates_per_area = (
+            float(self._candidate_count + self._trail.candidate_count) /
+            (self._slot_visit_count * slot_length**2 + self._trail.scanned_area))
+        # The width of the area queries cover, with the visited slots
+        # being about (query_width/slot_length + 1)**2
+        query_width = slot_length * max(0.0, math.sqrt(slots_per_query) - 1)
+        def cost(length):
+            slots = (query_width/length + 1)**2
+            return (self.slot_cost*slots +
+                    self.candidate_cost*candidates_per_area*slots*length**2)
+        length = min([count*max_diameter
+                      for count in self.slot_diameters_choices], key=cost)
+        return length, length
+
+    def adapt(self, diameter=0):
+        """Re-index with the suggested slot size, if there is one, and
+        return whether there was.  The diameter of the circles to be
+        added may be given."""
+        slot_size = self.suggested_slot_size(diameter)
+        if slot_size is None:
+            return False
+        self.adaptations += 1
+        if slot_size != self.slot_size:
+            self.reindex(slot_size)
+        else:
+            self._reset_stats()
+        return True
+
+    def _candidates(self, slot_keys):
+        """Return the ids of the circles in the given slots"""
+        candidates = []
+        self._query_count += 1
+        for slot_key in slot_keys:
+            self._slot_visit_count += 1
+            slot_ids = self._ids_of_slot.get(slot_key)
+            if slot_ids:
+                candidates.extend(slot_ids)
+        self._candidate_count += len(candidates)
+        return candidates
+
+    def _reach(self, diameter):
+        """How far the center of a circle colliding with a circle of
+        the given diameter may be"""
+        return (diameter + self._max_diameter)/2
+
+    def overlapping(self, (x, y), diameter, circle_ids):
+        """Return those of the given circles that collide with the
+        given circle."""
+        positions = self._positions
+        diameters = self._diameters
+        left = x - diameter/2
+        top = y - diameter/2
+        result = []
+        for circle_id in circle_ids:
+            if circle_id < 0:
+                other_x, other_y = self._trail.position(circle_id)
+                other_diameter = self._trail.diameter(circle_id)
+            else:
+                packed = positions[circle_id]
+                other_x = packed & 0xFFFF
+                other_y = packed >> 16
+                other_diameter = diameters[circle_id]
+            other_left = other_x - other_diameter/2
+            other_top = other_y - other_diameter/2
+            if (left < other_left + other_diameter and other_left < left + diameter and
+                top < other_top + other_diameter and other_top < top + diameter and
+                (x-other_x)**2 + (y-other_y)**2 <= ((diameter + other_diameter) / 2)**2):
+                result.append(circle_id)
+        return result
+
+    def _near_segment(self, circle_ids, start, end, diameter):
+        positions = self._positions
+        diameters = self._diameters
+        return [circle_id for circle_id in circle_ids
+                if (sqr_distance_to_segment(unpack_position(positions[circle_id]),
+                                            start, end) <=
+                    ((diameter + diameters[circle_id])/2.0)**2)]
+
+    def own_collision_seq(self, position, diameter, owner, fresh_seq, old_fresh_seq,
+                          candidates):
+        """Return the lowest of fresh_seq and the seqs of the owner's
+        circles colliding with the given circle, or None if it collides
+        with a circle of another owner or older than old_fresh_seq.
+
+        The candidates are the ids of the circles it may collide with,
+        found by capsule queries, unless the engine has no
+        capsule_queries.
+        """
+        for circle_id in self.overlapping(position, diameter, candidates):
+            seq = self.seq(circle_id)
+            if self.owner(circle_id) != owner or seq < old_fresh_seq:
+                return None
+            fresh_seq = min(fresh_seq, seq)
+        return fresh_seq
+
+    def collisions(self, position, diameter):
+        """Return the ids of the circles colliding with the given circle"""
+        return (self._live_collisions(position, diameter) +
+                self._trail.collisions(position, diameter))
+
+    def capsule_collisions(self, start, end, diameter):
+        """Return the ids of the circles colliding with a circle of the
+        given diameter sliding from start to end."""
+        return (self._live_capsule_collisions(start, end, diameter) +
+                self._trail.capsule_collisions(start, end, diameter))
+
+    def batch_capsule_collisions(self, capsules):
+        """Return the capsule_collisions of each of the given (start,
+        end, diameter) capsules.
+
+        The circles added after the batch query are collected, so those
+        the capsules also collide with can be found with
+        added_capsule_collisions.  No circles may be removed until the
+        next batch query.
+
+        Unless the engine has batch_queries, this costs more than
+        querying each capsule when it is needed.
+        """
+        self._batch_added_ids = array('i')
+        return self._batch_capsule_collisions(capsules)
+
+    def _batch_capsule_collisions(self, capsules):
+        return [self.capsule_collisions(start, end, diameter)
+                for start, end, diameter in capsules]
+
+    def added_capsule_collisions(self, start, end, diameter):
+        """Return the ids of the circles added since the last batch
+        query that collide with the given capsule"""
+        return self._near_segment(self._batch_added_ids, start, end, diameter)
+
+    def in_rect(self, rect):
+        """Return the ids of the circles whose bounding rects overlap
+        the given rect"""
+        return self._live_in_rect(rect) + self._trail.in_rect(rect)
+
+    def _live_in_rect(self, rect):
+        # Not counted by the cost model, which is for the collision
+        # queries
+        reach = self._max_diameter/2 + 1
+        candidates = []
+        for slot_key in self._slot_keys_of_rect(rect.inflate(2*reach, 2*reach)):
+            candidates.extend(self._ids_of_slot.get(slot_key, ()))
+        return [circle_id for circle_id in candidates
+                if self._bounding_rect(circle_id).colliderect(rect)]
+
+    def _bounding_rect(self, circle_id):
+        x, y = self.position(circle_id)
+        diameter = self.diameter(circle_id)
+        return Rect((x - diameter/2, y - diameter/2), (diameter, diameter))
+
+    def _live_collisions(self, position, diameter):
+        slot_keys = self._slot_keys_of_reach(position, self._reach(diameter))
+        return self.overlapping(position, diameter, self._candidates(slot_keys))
+
+    def _live_capsule_collisions(self, start, end, diameter):
+        rect = capsule_rect(start, end, (diameter + self._max_diameter)/2.0)
+        return self._near_segment(self._candidates(self._slot_keys_of_rect(rect)),
+                                  start, end, diameter)
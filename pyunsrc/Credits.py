@@ -1,7 +1,7 @@
 import pygame
 
 from configfile import config
-from util import key_identified
+from util import key_identified, display_format
 from WormText import WormText
 
 GRAVITY = config.CREDITS_GRAVITY
@@ -11,7 +11,7 @@ class Credits(object):
         self.game = game
         self.worm_text = WormText('Eyal Lotem')
         
-        self._surface = pygame.Surface(config.DISPLAY_MODE, pygame.SWSURFACE)
+        self._surface = display_format(pygame.Surface(config.DISPLAY_MODE, pygame.SWSURFACE))
         self._surface.set_alpha(254 * config.CREDITS_ALPHA)
         
         self.width, self.height = config.DISPLAY_MODE
@@ -32,41 +32,43 @@ class Credits(object):
             "Worm Eyes",
             "Network code",
         ])
-        self._cur_text_draw = self._draw_nothing
-        self._worm_text_draw = self._worm_text_draw_normal
+        self._advance_text = self._advance_nothing
+        self._advance_worm_text = self._paint_worm_text
+        # Identifies the worm text painting progress
+        self._worm_text_frame = 0
+        # The number of frames advanced
+        self.frame = 0
+        self._text_position = None
     
     def _next_text(self):
         try:
             self._cur_text = self._texts.next()
         except StopIteration:
             return
-        self._cur_rendered_text = self._font.render(self._cur_text, True, config.CREDITS_TEXT_COLOR)
+        self._cur_rendered_text = display_format(
+            self._font.render(self._cur_text, True, config.CREDITS_TEXT_COLOR))
         text_width, text_height = self._cur_rendered_text.get_size()
         self._cur_text_speed = 0
         self._cur_text_xpos = (self.width - text_width)/2
         self._cur_text_ypos = 0
         worm_text_x, worm_text_y = self._worm_text_pos
         self._cur_text_floor = worm_text_y - text_height - 5
-        self._cur_text_draw = self._drop_text
+        self._advance_text = self._drop_text
 
-    def _draw_nothing(self, surface):
+    def _advance_nothing(self):
         pass
 
-    def _drop_text(self, surface):
-        surface.blit(self._cur_rendered_text,
-                     (self._cur_text_xpos,
-                      self._cur_text_ypos))
+    def _drop_text(self):
+        self._text_position = self._cur_text_xpos, self._cur_text_ypos
         self._cur_text_ypos += self._cur_text_speed
         self._cur_text_speed += GRAVITY
         if self._cur_text_ypos >= self._cur_text_floor:
             self._cur_text_ypos = self._cur_text_floor
             self._wait_time = config.CREDITS_WAIT_BETWEEN_TEXTS
-            self._cur_text_draw = self._wait_with_text
+            self._advance_text = self._wait_with_text
     
-    def _wait_with_text(self, surface):
-        surface.blit(self._cur_rendered_text,
-                     (self._cur_text_xpos,
-                      self._cur_text_ypos))
+    def _wait_with_text(self):
+        self._text_position = self._cur_text_xpos, self._cur_text_ypos
         self._wait_time -= 1
         if self._wait_time == 0:
             self._next_text()
@@ -84,15 +86,25 @@ class Credits(object):
     def all_keys(self):
         return [config.CANCEL_KEY]
 
-    def _worm_text_draw_existing_surface(self, surface):
-        surface.blit(self._surface, (0, 0))
-    
-    def _worm_text_draw_normal(self, surface):
+    def _paint_worm_text(self):
         if self.worm_text.draw(self._worm_text_surface):
             self._next_text()
-            self._worm_text_draw = self._worm_text_draw_existing_surface
-        self._worm_text_draw_existing_surface(surface)
+            self._advance_worm_text = self._advance_nothing
+        self._worm_text_frame += 1
+
+    def advance(self):
+        """Advance the animation by a frame"""
+        self.frame += 1
+        self._advance_worm_text()
+        self._advance_text()
 
-    def draw(self, surface):
-        self._worm_text_draw(surface)
-        self._cur_text_draw(surface)
+    def overlays(self):
+        """Return the (name, key, rect, surface_func) of the layers of
+        the credits, see Overlays"""
+        overlays = [('credits', self._worm_text_frame, self._surface.get_rect(),
+                     lambda: self._surface)]
+        if self._text_position is not None:
+            rect = pygame.Rect(self._text_position, self._cur_rendered_text.get_size())
+            overlays.append(('credits text', (self._cur_text, self._text_position), rect,
+                             lambda: self._cur_rendered_text))
+        return overlays
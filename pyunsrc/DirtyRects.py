@@ -0,0 +1,51 @@
+import pygame
+
+# Above this many rects, their union is updated instead
+MAX_RECTS = 64
+
+class DirtyRects(object):
+    """The regions of the display changed since it was last updated"""
+    def __init__(self, size):
+        self.rect = pygame.Rect((0, 0), size)
+        self.set_all()
+
+    def set_all(self):
+        self._all = True
+        self._rects = []
+
+    def is_all(self):
+        return self._all
+
+    def add(self, rect, offset=(0, 0)):
+        if self._all:
+            return
+        rect = pygame.Rect(rect).move(offset).clip(self.rect)
+        if rect:
+            self._rects.append(rect)
+
+    def add_list(self, rects, offset=(0, 0)):
+        for rect in rects:
+            self.add(rect, offset)
+
+    def intersects(self, rect):
+        return self._all or pygame.Rect(rect).collidelist(self._rects) != -1
+
+    def clipped(self, rect):
+        """Return the parts of the dirty rects inside the rect"""
+        rect = pygame.Rect(rect)
+        if self._all:
+            return [rect.clip(self.rect)]
+        return [dirty.clip(rect) for dirty in self._rects if dirty.colliderect(rect)]
+
+    def pop(self):
+        """Return the dirty rects and forget them, or None if all of
+        the display is dirty"""
+        if self._all:
+            rects = None
+        elif len(self._rects) > MAX_RECTS:
+            rects = [self._rects[0].unionall(self._rects[1:])]
+        else:
+            rects = self._rects
+        self._all = False
+        self._rects = []
+        return rects
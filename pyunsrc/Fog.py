@@ -0,0 +1,47 @@
+from configfile import config
+from stamps import stamp_all
+
+class Fog(object):
+    """Draws the circles of a worm area seen by some viewers: those
+    colliding with the vision circle of any of them, faded by their
+    squared distance from the nearest one that sees them.
+
+    The fade is quantized to fade_levels levels, and the
+    circles of each level, owner and diameter are stamped together,
+    the nearest (brightest) last.
+    """
+    def __init__(self, worm_area):
+        self._worm_area = worm_area
+        self.fade_levels = config.FOG_FADE_LEVELS
+
+    def _fade_level(self, sqr_distance, sqr_vision_radius):
+        fade = 1.0 - min(1.0, sqr_distance / float(sqr_vision_radius))
+        return int(fade * self.fade_levels)
+
+    def _groups(self, viewer_positions, vision_diameter):
+        """Return the (level, owner, diameter, positions) of the seen
+        circles"""
+        canvas = self._worm_area.canvas
+        sqr_distances = {}
+        for x, y in viewer_positions:
+            for circle_id in canvas.collisions((int(x), int(y)), vision_diameter):
+                circle_x, circle_y = canvas.position(circle_id)
+                sqr_distance = (circle_x - x)**2 + (circle_y - y)**2
+                if sqr_distance < sqr_distances.get(circle_id, sqr_distance + 1):
+                    sqr_distances[circle_id] = sqr_distance
+        sqr_vision_radius = (vision_diameter/2)**2
+        positions_of_key = {}
+        for circle_id, sqr_distance in sqr_distances.iteritems():
+            key = (self._fade_level(sqr_distance, sqr_vision_radius),
+                   canvas.owner(circle_id), canvas.diameter(circle_id))
+            positions_of_key.setdefault(key, []).append(canvas.position(circle_id))
+        return [key + (positions,) for key, positions in positions_of_key.iteritems()]
+
+    def draw(self, surface, viewer_positions, vision_diameter, camera):
+        """Draw the seen circles on the view of the Camera"""
+        levels = self.fade_levels
+        for level, owner, diameter, positions in sorted(self._groups(viewer_positions,
+                                                                     vision_diameter)):
+            color = [c*level/levels for c in self._worm_area.owner_color(owner)]
+            stamp_all(surface, color, camera.positions_to_view(positions),
+                      camera.diameter_to_view(diameter))
@@ -3,7 +3,6 @@ import time
 import pygame
 import pools
 import network
-import instructions
 import menus
 import os
 import DictAttrAccessor
@@ -13,23 +12,46 @@ from configfile import config
 from sets import Set as set
 from Bunch import Bunch
 from log import warning, debug_log
-from util import font_height, get_computer_name
+from util import get_computer_name, random_of
 
 from Hud import Hud
-from Player import PlayerDied, Player
-from PlayerController import PlayerController
+from Player import Player
+from PlayerController import PlayerController, ScriptedPlayerController
 from WormArea import WormArea
+from WormSet import WormSet
+from Scheduler import Scheduler, UnpacedScheduler
+from Screen import Screen
 from GameControllers import GenericGameController, GameController
 from Credits import Credits
 
 from pygame_keys import key_name
 from version import VERSION
 
+# The seed of the scripted players' keys, the same in every benchmark
+BENCHMARK_SEED = 1
+
 class KillRequest(Exception): pass
 
-class Game(object):
-    def __init__(self, network_mode):
+class Game(Screen):
+    def __init__(self, network_mode, headless=False, render_interval=0, render_process=None,
+                 benchmark=None):
+        """In headless mode there is no window, and the display is only
+        rendered (offscreen) every render_interval frames, if at all.
+        With a RenderProcess, there is no window either, and snapshots
+        of the game are published to it to draw instead.  A benchmark
+        is the (players, ticks) of a local game of scripted players,
+        which runs its ticks back to back rather than at
+        GAME_ITERATIONS_PER_SECOND (see UnpacedScheduler), and exits
+        after the ticks with their rate."""
         self.network_mode, self.local_name, self.network_data = network_mode
+        assert benchmark is None or self.network_mode == 'local', \
+               "Network peers must keep the pace"
+        self._benchmark = None
+        self.headless = headless or render_process is not None
+        self._render_interval = render_interval
+        self._render_process = render_process
+        self._published_clears = self._round_start = None
+        self._frame_count = 0
         self._pause_state = None
         self._is_started = False
         self._all_controllers = []
@@ -48,8 +70,11 @@ class Game(object):
         self._start_network()
 
         self.worm_area = WormArea(self._weakref(), self.worm_area_surface)
+        self.worm_set = WormSet(self.worm_area.arena_size, self.net_config, self.worm_area)
 
         self.update_message()
+        if benchmark is not None:
+            self._start_benchmark(*benchmark)
 
     def can_start_game(self):
         return not self._is_started and self.is_network_game()
@@ -65,15 +90,9 @@ class Game(object):
         return player in self.network.local_host.players
 
     def _init_graphics(self):
-        self._display_flags = 0
-        self._setup_display()
-        
-        self.worm_area_surface = pygame.Surface(config.WORM_AREA_SIZE, pygame.SWSURFACE)
-        
-        self._init_font()
-        self._init_text()
+        self._init_screen()
         self._init_hud()
-        self._instructions_surface = None
+        self._instructions_lines = None
         self._init_menus()
         self.credits = None
 
@@ -95,7 +114,7 @@ class Game(object):
     def _start_game(self):
         self.common_random_seed = self.random().randrange(1L<<32)
         self._is_started = True
-        self._instructions_surface = None
+        self._instructions_lines = None
         self.controller = GameController(self._weakref())
         self.register_controller(self.controller, priority=5)
         self._start_pause_and_reset_game()
@@ -131,7 +150,7 @@ class Game(object):
     def _start_network(self):
         if self.network_mode != 'local':
             self.network.start_connecting()
-            self._instructions_surface = self._pregame_instructions_surface
+            self._instructions_lines = self._pregame_instructions_lines
         self._set_net_config(self.network.publicized_data())
         if self.network_mode == 'local':
             self._start_game()
@@ -157,21 +176,6 @@ class Game(object):
     def is_paused(self):
         return self._pause_state is not None
 
-    def is_fullscreen(self):
-        return bool(self._display_flags & pygame.FULLSCREEN)
-
-    def set_fullscreen(self, value):
-        self._display_flags &= ~pygame.FULLSCREEN
-        if value:
-            self._display_flags |= pygame.FULLSCREEN
-        size = self.display.get_size()
-        copy = pygame.Surface(size, pygame.SWSURFACE)
-        copy.blit(self.display, (0, 0))
-        pygame.display.quit()
-        pygame.display.init()
-        self._setup_display()
-        self.display.blit(copy, (0, 0))
-
     def all_keys(self):
         return sum([list(controller.all_keys())
                     for priority, controller in self._all_controllers],
@@ -203,13 +207,6 @@ class Game(object):
             text = 'Press %s to start the game' % (key_name(config.PAUSE_KEY),)
         self.set_text(text)
 
-    def get_text(self):
-        return self._current_text
-    
-    def set_text(self, text):
-        self._current_text = text
-        self._current_text_surface = self._font.render(text, True, config.TEXT_COLOR)
-
     def add_text(self, text):
         if len(self._texts) >= config.TEXTS_MAX_COUNT:
             self._texts.pop(0)
@@ -220,18 +217,37 @@ class Game(object):
 
     def _run(self):
         counter = 0
-        self._clock = pygame.time.Clock()
+        if self._benchmark is not None:
+            self._scheduler = UnpacedScheduler(self.is_paused)
+        else:
+            self._scheduler = Scheduler()
+        governor = self._governor
         while True:
-            counter += 1
-            is_net_iteration = (counter >= self.net_config.NET_INTERVAL)
-            self._clock.tick(self.net_config.GAME_ITERATIONS_PER_SECOND)
+            iteration_start = start = time.time()
             self.handle_all_events()
-            self._clock_tick(is_net_iteration)
-            self._draw()
-            if is_net_iteration:
-                self.network.update()
-                self.execute_actions()
-                counter = 0
+            governor.measure('events', time.time() - start)
+            tick_interval = 1.0 / self.net_config.GAME_ITERATIONS_PER_SECOND
+            while self._scheduler.tick_due(tick_interval):
+                start = time.time()
+                if self._benchmark is not None:
+                    self._benchmark_tick()
+                counter += 1
+                is_net_iteration = (counter >= self.net_config.NET_INTERVAL)
+                self._clock_tick(is_net_iteration)
+                self._advance_animations()
+                if is_net_iteration:
+                    self.network.update()
+                    self.execute_actions()
+                    counter = 0
+                governor.measure('tick', time.time() - start)
+            if self._scheduler.frame_due():
+                start = time.time()
+                self._draw_frame()
+                governor.measure('frame', time.time() - start)
+                governor.frame_done(tick_interval)
+            if self._benchmark is not None and not self.is_paused():
+                self._benchmark.seconds += time.time() - iteration_start
+            self._scheduler.wait()
 
     def run(self):
         try:
@@ -239,6 +255,42 @@ class Game(object):
         except KillRequest:
             pass
 
+    def _start_benchmark(self, players, ticks):
+        """Create the scripted players of a benchmark of the ticks"""
+        random = random_of(BENCHMARK_SEED)
+        controllers = []
+        for index in xrange(players):
+            player = self._create_player(self.network.local_host)
+            if player is None:
+                break
+            player_controller = ScriptedPlayerController(player, random.split())
+            self.register_controller(player_controller, priority=6)
+            self.player_controllers[player] = player_controller
+            controllers.append(player_controller)
+        self._benchmark = Bunch(controllers=controllers, ticks=ticks, ticks_run=0,
+                                seconds=0.0, unpaused_state=None)
+
+    def _benchmark_tick(self):
+        """Steer the scripted players before each tick, unpausing the
+        game for them, and exit with the rate of the ticks once they
+        all ran.  The paused ticks, which keep the pace of the game,
+        are not counted."""
+        benchmark = self._benchmark
+        if self.is_paused():
+            # Once for each pause, the unpause runs at a net iteration
+            if benchmark.unpaused_state is not self._pause_state:
+                benchmark.unpaused_state = self._pause_state
+                self.network.run_action_on_all('unpause')
+            return
+        if benchmark.ticks_run >= benchmark.ticks:
+            print '%d ticks of %d players in %.2f seconds: %.1f ticks per second' % (
+                benchmark.ticks_run, len(benchmark.controllers), benchmark.seconds,
+                benchmark.ticks_run / max(benchmark.seconds, 1e-9))
+            self.exit()
+        for player_controller in benchmark.controllers:
+            player_controller.advance()
+        benchmark.ticks_run += 1
+
     def execute_actions(self):
         for host, host_actions in self.network.iteration_actions():
             for action_str, action_args in host_actions:
@@ -250,7 +302,7 @@ class Game(object):
         self._clock_tick = self._pause_clock_tick
         
         self._pause_state = ps = Bunch()
-        self._instructions_surface = self._paused_instructions_surface
+        self._instructions_lines = self._paused_instructions_lines
         ps.required_unpausers = required_unpausers
         ps.unpausers = set()
         ps.callback = after_pause_callback
@@ -260,13 +312,6 @@ class Game(object):
     def _to_game_state(self):
         self._clock_tick = self._game_clock_tick
 
-    def _init_font(self):
-        self._font = pygame.font.SysFont('', config.TEXT_FONT_SIZE)
-        self._texts_font = pygame.font.SysFont('', config.TEXTS_FONT_SIZE)
-
-    def _init_text(self):
-        self._texts = []
-
     def _init_hud(self):
         self.hud = Hud(self._weakref())
 
@@ -276,7 +321,7 @@ class Game(object):
         else:
             return config.DISABLED_INSTRUCTIONS_COLOR, line
 
-    def _paused_instructions_surface(self):
+    def _paused_instructions_lines(self):
         lines = map(self._instructions_line, [
             (True, "PAUSED"),
             (True, ""),
@@ -291,9 +336,9 @@ class Game(object):
             (self.can_unpause(), "Press %s to unpause the game" % (key_name(config.PAUSE_KEY),)),
             (self.is_network_game(), "Press %s to send a text message" % (key_name(config.SEND_TEXT_KEY),)),
         ])
-        return instructions.create_surface(lines)
+        return tuple(lines)
 
-    def _pregame_instructions_surface(self):
+    def _pregame_instructions_lines(self):
         lines = map(self._instructions_line, [
             (True, "GAME SETUP"),
             (True, ""),
@@ -302,105 +347,97 @@ class Game(object):
             (self.is_network_game(), "Press %s to start the game" % (key_name(config.START_GAME_KEY),)),
             (self.is_network_game(), "Press %s to send a text message" % (key_name(config.SEND_TEXT_KEY),)),
         ])
-        return instructions.create_surface(lines)
+        return tuple(lines)
 
     def _set_net_config(self, net_config_dict):
         self.net_config_dict = net_config_dict.copy()
         self.net_config = DictAttrAccessor.DictAttrAccessor(self.net_config_dict)
     
-    def _setup_display(self):
-        self.display = pygame.display.set_mode(config.DISPLAY_MODE, self._display_flags)
-        self.hud_area = self.display.subsurface((config.HUD_AREA_POS, config.HUD_AREA_SIZE))
-        self.menu_area = self.display.subsurface((config.MENU_AREA_POS, config.MENU_AREA_SIZE))
-    
     def _handle_pygame_event(self, event):
         for priority, controller in self._all_controllers[:]:
             if controller.handle_pygame_event(event):
                 break
 
-    def _draw(self):
-        self._draw_worm_area()
-        self._draw_instructions()
-        
-        self.hud.draw(self.hud_area)
-        self._draw_bounds_rect()
-        self._draw_text()
-        self._draw_fps()
-
-        for menu in self.menus.itervalues():
-            menu.draw(self.menu_area)
-
-        self._draw_credits()
-
-        pygame.display.update()
+    def _draw_frame(self):
+        self._frame_count += 1
+        if self._render_process is not None:
+            self._publish_frame()
+        elif self.headless and not self._render_interval:
+            self.worm_area.discard_drawing()
+        elif not self.headless or self._frame_count % self._render_interval == 0:
+            # Skipped frames accumulate the worms' drawing
+            self._draw()
 
-    def _draw_worm_area(self):
-        self.worm_area.draw()
-        self.display.blit(self.worm_area_surface, config.WORM_AREA_POS)
-    
-    def _draw_credits(self):
+    def _publish_frame(self):
+        self._expire_texts()
+        render_process = self._render_process
+        if self.worm_area.clears != self._published_clears:
+            # The circles published from now on are of the new round
+            self._published_clears = self.worm_area.clears
+            self._round_start = render_process.circle_count()
+        for player in self.all_players():
+            worm = player.worm
+            render_process.add_circles(worm.owner, self.net_config.DIAMETER, worm.circles_to_draw)
+            worm.discard_drawing()
+        render_process.publish(self._snapshot())
+
+    def _tick_fraction(self):
+        # The worms only move in the game state
+        if self._clock_tick != self._game_clock_tick:
+            return 0.0
+        return self._scheduler.tick_fraction()
+
+    def _snapshot(self):
+        """What the Renderer draws, besides the trail circles"""
+        players = list(self.all_players())
+        chosen_player = None
+        if players and getattr(self, 'controller', None) is not None:
+            chosen_player = self.controller.chosen_player()
+        instructions_lines = None
+        if self._instructions_lines is not None:
+            instructions_lines = self._instructions_lines()
+        credits_frame = None
         if self.credits is not None:
-            self.credits.draw(self.display)
-
-    def _draw_instructions(self):
-        if self._instructions_surface is not None:
-            self.display.blit(self._instructions_surface(), config.WORM_AREA_POS)
-
-    def _draw_fps(self):
-        self.display.fill(config.CLEAR_COLOR, (config.FPS_POS, config.FPS_SIZE))
-        
-        text = '%.2f' % (self._clock.get_fps(),)
-        fps_text_surface = self._font.render(text, True, config.FPS_COLOR)
-        fpsx, fpsy = config.FPS_POS
-        width, height = config.FPS_SIZE
-        x = fpsx + width - fps_text_surface.get_width()
-        self.display.blit(fps_text_surface, (x, fpsy))
-
-    def _draw_text(self):
-        self.display.fill(config.CLEAR_COLOR, (config.TEXT_AREA_POS, config.TEXT_AREA_SIZE))
-        self.display.blit(self._current_text_surface, config.TEXT_AREA_POS)
-
-        if not self._texts:
-            return
-        for index, (text_time, text) in enumerate(self._texts):
-            if text_time + config.TEXTS_EXPIRATION_TIME > time.time():
-                # text has not expired yet
-                break
-            # keep going while texts are expired
-        else:
-            index = len(self._texts)
-        # Get rid of all the expired texts
-        self._texts = self._texts[index:]
-
-        x, y = config.TEXTS_LEFT_BOTTOM
-        x += config.WORM_AREA_POS[0]
-        y += config.WORM_AREA_POS[1]
-        # Now x, y are the display-relative position of the bottom of the texts area
-
-        text_height = font_height(self._texts_font)
-        height = text_height*len(self._texts)
-        y -= height
-        # Now x, y are the top of the texts area
-        
-        for text_time, text in self._texts:
-            text_surface = self._texts_font.render(text, True, config.TEXTS_COLOR)
-            self.display.blit(text_surface, (x, y))
-            y += text_height
-
-    def _draw_bounds_rect(self):
-        (x, y), (w, h) = config.WORM_AREA_POS, config.WORM_AREA_SIZE
-        rw = config.BOUNDS_RECT_WIDTH
-        rect = ((x - rw, y - rw),
-                (w + rw, h + rw))
-        pygame.draw.rect(self.display, config.BOUNDS_RECT_COLOR, rect, config.BOUNDS_RECT_WIDTH)
+            credits_frame = self.credits.frame
+        return dict(
+            round = (self.worm_area.clears, self._round_start),
+            tick_fraction = self._tick_fraction(),
+            net_config = dict([(name, getattr(self.net_config, name))
+                               for name in ('DIAMETER', 'FOG_ENABLED', 'FOG_VISION_DIAMETER')]),
+            owner_colors = self.worm_area.owner_colors(),
+            worms = tuple([(player.worm.owner, player.worm.position, player.worm.overlay_state(),
+                            player.alive, self.is_local_player(player), player is chosen_player)
+                           for player in players]),
+            hud = self.hud.state(),
+            text = self.get_text(),
+            texts = tuple(self._texts),
+            instructions = instructions_lines,
+            menus = tuple([(name, menu.phase()) for name, menu in self.menus.iteritems()
+                           if menu.is_enabled()]),
+            credits = credits_frame,
+            fullscreen = self.is_fullscreen(),
+        )
+
+    def _advance_animations(self):
+        """Advance the menus and credits, at the rate of the ticks"""
+        if self._governor.allows('menu animation'):
+            for menu in self.menus.itervalues():
+                if menu.is_enabled():
+                    menu.advance()
+        if self.credits is not None and self._governor.allows('credits'):
+            self.credits.advance()
 
     def _update_players(self):
-        for player in self.all_players():
-            try:
-                player.update()
-            except PlayerDied:
-                for player in self.living_players():
-                    player.increase_score()
+        players = list(self.living_players())
+        indexes = [player.worm.index for player in players]
+        self.worm_set.steer(indexes, [player.keys_state for player in players])
+        # The worms die one after the other, each death scoring for
+        # the players still living at its time
+        player_of_index = dict(zip(indexes, players))
+        for index in self.worm_set.forward(indexes, self.speed):
+            player_of_index[index].kill()
+            for player in self.living_players():
+                player.increase_score()
     
     def _reset_players(self):
         for player in self.all_players():
@@ -437,7 +474,11 @@ class Game(object):
         self._start_pause(self._reset_back_to_game)
 
     def handle_all_events(self):
-        for event in pygame.event.get():
+        if self._render_process is None:
+            events = pygame.event.get()
+        else:
+            events = self._render_process.events()
+        for event in events:
             self._handle_pygame_event(event)
 
     def _game_increase_speed(self):
@@ -467,6 +508,7 @@ class Game(object):
             return
         pools.colors.insert(0, (player.name, player.color()))
         host.players.pop(player_index)
+        self.worm_set.remove(player.worm.index)
         self.update_message()
         return player
 
@@ -494,7 +536,8 @@ class Game(object):
             self._last_waiting_for_players = time.time()
             self.add_text('Waiting for %s' % host_names)
         self.handle_all_events()
-        self._draw()
+        self._advance_animations()
+        self._draw_frame()
 
     def network__host_added(self, host):
         host.players = []
@@ -504,6 +547,8 @@ class Game(object):
     
     def network__host_removed(self, host):
         self.add_text("%s has left the game" % (host.name,))
+        for player in host.players:
+            self.worm_set.remove(player.worm.index)
         
     def network__new_connector1(self, remote_host_name, remote_address): pass
     def network__new_connector2(self, remote_host_name, remote_address): pass
@@ -520,6 +565,7 @@ class Game(object):
     def unshow_credits(self):
         self.unregister_controller(self.credits)
         self.credits = None
+        self._dirty_rects.set_all()
     
     # Action handlers
     def _action__add_interval(self, src_host, count):
@@ -560,7 +606,7 @@ class Game(object):
             if src_host is not self.network.local_host:
                 self.add_text("%s has unpaused game" % (src_host.name,))
             callback = ps.callback
-            self._pause_state = self._instructions_surface = None
+            self._pause_state = self._instructions_lines = None
             self.update_message()
             callback()
 
@@ -599,3 +645,5 @@ class Game(object):
         self.add_text("%s set %s to %s" %
                       (src_host.name, name, value))
         setattr(self.net_config, name, value)
+        if name == 'DIAMETER':
+            self.worm_area.diameter_changed()
@@ -0,0 +1,73 @@
+from collections import deque
+from configfile import config
+from log import warning
+
+# The optional work, in the order it is dropped
+OPTIONAL_WORK = [
+    'fps text',
+    'menu animation',
+    'credits',
+    'hud refresh',
+    'fog fade',
+]
+
+PHASES = ['events', 'tick', 'frame']
+
+class Governor(object):
+    """Keeps the frames within the time the simulation leaves them.
+
+    The time of each phase of the main loop is measured.  A frame's
+    budget is GOVERNOR_BUDGET of a tick interval, less the time of a
+    tick, as simulation and network work are never dropped.  When the
+    recent frames take longer on average, the level goes up and the
+    next optional work is dropped, and when they take less than
+    GOVERNOR_RECOVERY of the budget it goes down again.  Every change
+    of the level is reported.
+
+    The optional_work is the part of OPTIONAL_WORK the drawing process
+    drops, in the same order.
+    """
+    def __init__(self, optional_work=OPTIONAL_WORK):
+        self.optional_work = optional_work
+        self.level = 0
+        self._times = dict([(phase, deque(maxlen=config.GOVERNOR_FRAMES))
+                            for phase in PHASES])
+        self._frames = 0
+
+    def measure(self, phase, seconds):
+        self._times[phase].append(seconds)
+
+    def allows(self, work):
+        """Return whether the optional work may be done"""
+        return self.optional_work.index(work) >= self.level
+
+    def _mean(self, phase):
+        times = self._times[phase]
+        if not times:
+            return 0.0
+        return sum(times) / len(times)
+
+    def frame_done(self, tick_interval):
+        """Change the level by the recent frames, after each frame"""
+        self._frames += 1
+        if self._frames < config.GOVERNOR_FRAMES:
+            return
+        budget = tick_interval * config.GOVERNOR_BUDGET - self._mean('tick')
+        frame_time = self._mean('frame')
+        if frame_time > budget and self.level < len(self.optional_work):
+            self.level += 1
+            self._report('over', budget, 'dropping %s' % (self.optional_work[self.level-1],))
+        elif frame_time < budget * config.GOVERNOR_RECOVERY and self.level > 0:
+            self.level -= 1
+            self._report('under', budget, 'restoring %s' % (self.optional_work[self.level],))
+        else:
+            return
+        # The next change is by the frames of the new level
+        self._frames = 0
+
+    def _report(self, relation, budget, change):
+        warning("Frames %s budget of %.1fms (%s), quality level %d: %s" % (
+            relation, budget * 1000,
+            ', '.join(['%s %.1fms' % (phase, self._mean(phase) * 1000)
+                       for phase in PHASES]),
+            self.level, change))
@@ -2,27 +2,35 @@ import pygame
 import pools
 import math
 import LinePainter
-from util import font_height, average
+import glyphs
+from util import font_height, average, display_format
+from stamps import stamp_all
+from CachedFunc import CachedFunc
 from configfile import config
 
+def worm_surface(color, bgcolor, diameter):
+    """A sample of a worm of the given color and diameter"""
+    radius = diameter/2
+    surface = pygame.Surface((config.WORM_EXAMPLE_WIDTH, diameter*2+6))
+    surface.fill(bgcolor)
+    xs = xrange(radius+2, config.WORM_EXAMPLE_WIDTH-radius-2)
+    positions = []
+    for i, x in enumerate(xs):
+        radian_part = float(i) * 2 * math.pi / len(xs)
+        y = diameter+3 + math.sin(radian_part * 2)*radius
+        positions.append((x, int(y)))
+    stamp_all(surface, color, positions, diameter)
+    return display_format(surface)
+worm_surface = CachedFunc(worm_surface)
+
 class LinePainter(LinePainter.LinePainter):
     def __init__(self, diameter):
         super(LinePainter, self).__init__()
         self._diameter = diameter
-        self._radius = self._diameter/2
     def put_text(self, font, color, bgcolor, text, antialiased=True):
-        self.put(font.render(text, antialiased, color, bgcolor))
+        self.put(glyphs.render(font, text, antialiased, color, bgcolor))
     def put_worm(self, color, bgcolor):
-        self.put(self._create_worm_surface(color, bgcolor))
-    def _create_worm_surface(self, color, bgcolor):
-        surface = pygame.Surface((config.WORM_EXAMPLE_WIDTH, self._diameter*2+6))
-        surface.fill(bgcolor)
-        xs = xrange(self._radius+2, config.WORM_EXAMPLE_WIDTH-self._radius-2)
-        for i, x in enumerate(xs):
-            radian_part = float(i) * 2 * math.pi / len(xs)
-            y = self._diameter+3 + math.sin(radian_part * 2)*self._radius
-            pygame.draw.circle(surface, color, map(int, (x, y)), self._radius)
-        return surface
+        self.put(worm_surface(color, bgcolor, self._diameter))
 
 class Hud(object):
     def __init__(self, game):
@@ -31,50 +39,91 @@ class Hud(object):
         The Hud must be initialized before any players are created.
         """
         self.game = game
-        self._font = pygame.font.SysFont('', config.HUD_FONT_SIZE)
-        self._bold_font = pygame.font.SysFont('', config.HUD_FONT_SIZE, bold=True)
-        self._small_font = pygame.font.SysFont('', config.KEYS_FONT_SIZE)
+        self._font = glyphs.font(config.HUD_FONT_SIZE)
+        self._bold_font = glyphs.font(config.HUD_FONT_SIZE, bold=True)
+        self._small_font = glyphs.font(config.KEYS_FONT_SIZE)
+        self._surface = display_format(pygame.Surface(config.HUD_AREA_SIZE, pygame.SWSURFACE))
+        self._rendered_state = None
 
-    def _host_color(self, host):
+    def _host_color(self, players):
         def player_colors_component(x):
-            return [player.worm.color[x] for player in host.players]
+            return [color[x] for color, alive, score, chosen, control_str in players]
         r, g, b = tuple([average(player_colors_component(i))/4.0
                          for i in xrange(3)])
         br, bg, bb = config.HUD_HOST_BASE_COLOR
         return r+br, g+bg, b+bb
 
-    def draw(self, surface):
+    def state(self):
+        """Everything the Hud shows, which is all _render reads"""
+        game = self.game
+        # There is no game controller before the game starts, but no
+        # players either
+        chosen_player = None
+        if any(host.players for host in game.network.hosts):
+            chosen_player = game.controller.chosen_player()
+        hosts = []
+        for host in game.network.hosts:
+            players = []
+            for player in host.players:
+                controller = game.player_controllers.get(player)
+                if controller is None:
+                    control_str = ''
+                else:
+                    control_str = controller.control_str()
+                players.append((tuple(player.worm.color), player.alive, player.score,
+                                player is chosen_player, control_str))
+            hosts.append((host.name, tuple(players)))
+        return (tuple(hosts), game.is_network_game(), game.net_config.DIAMETER,
+                config.SHOW_HOST_NAME, config.SHOW_TOTAL_SCORE,
+                tuple([color for color_name, color in pools.colors]))
+
+    def draw(self, surface, rects=None, refresh=True):
+        """Draw the Hud and return the rects of the surface it changed.
+
+        The Hud is rendered again only when something it shows changed
+        (and refresh is true, or it was never rendered), and drawn whole
+        then.  Otherwise only the given rects (all of the surface if
+        None) are restored from the rendered Hud.
+        """
+        if refresh or self._rendered_state is None:
+            state = self.state()
+            if state != self._rendered_state:
+                self._rendered_state = state
+                self._render(self._surface, state)
+                rects = None
+        if rects is None:
+            rects = [surface.get_rect()]
+        for rect in rects:
+            surface.blit(self._surface, rect, rect)
+        return rects
+
+    def _render(self, surface, state):
+        hosts, is_network_game, diameter, show_host_name, show_total_score, free_colors = state
         surface.fill(config.HUD_AREA_COLOR)
 
         x, y = (5, 5)
-        for host in self.game.network.hosts:
-            painter = LinePainter(self.game.net_config.DIAMETER)
-            host_color = self._host_color(host)
-            if self.game.is_network_game() and config.SHOW_HOST_NAME:
-                painter.put_text(self._font, (255, 255, 255), host_color, host.name)
+        for host_name, players in hosts:
+            painter = LinePainter(diameter)
+            host_color = self._host_color(players)
+            if is_network_game and show_host_name:
+                painter.put_text(self._font, (255, 255, 255), host_color, host_name)
                 painter.end_line()
-            for player in host.players:
-                color = player.worm.color
-                if not player.alive:
+            for color, alive, score, chosen, control_str in players:
+                if not alive:
                     color = tuple([i/2 for i in color])
 
                 font = self._font
-                if player is self.game.controller.chosen_player():
+                if chosen:
                     font = self._bold_font
                 
-                painter.put_text(font, color, host_color, '%02d ' % (player.score,))
+                painter.put_text(font, color, host_color, '%02d ' % (score,))
                 painter.put_worm(color, host_color)
 
-                controller = self.game.player_controllers.get(player)
-                if controller is None:
-                    control_str = ''
-                else:
-                    control_str = controller.control_str()
                 painter.put_text(self._small_font, color, host_color, ' ' + control_str)
                 painter.end_line()
 
-            if self.game.is_network_game() and config.SHOW_TOTAL_SCORE:
-                total = sum([player.score for player in host.players])
+            if is_network_game and show_total_score:
+                total = sum([score for color, alive, score, chosen, control_str in players])
                 painter.put_text(self._small_font, (255, 255, 255), host_color, 'Total: %02d' % (total,))
                 painter.end_line()
             
@@ -84,8 +133,8 @@ class Hud(object):
             painter.draw(surface, (x, y))
             
             y += height + 5
-        painter = LinePainter(self.game.net_config.DIAMETER)
-        for color_name, color in pools.colors:
+        painter = LinePainter(diameter)
+        for color in free_colors:
             painter.put_worm(color, config.CLEAR_COLOR)
             painter.end_line()
         painter.draw(surface, (x, y))
@@ -1,6 +1,7 @@
 import pygame
 import math
-from util import key_identified
+import glyphs
+from util import key_identified, display_format
 from pygame_keys import key_name
 from CachedFunc import CachedFunc
 from configfile import config
@@ -30,6 +31,43 @@ def conditional_text(enabled_func, t, f):
 
 OPTION_FONT_SIZE, OPTION_KEYS_FONT_SIZE = config.MENU_FONT_SIZES
 
+def line_surfaces(font, keys_font, is_enabled, text, keys_str):
+    """Return the surfaces of the text and keys of an option line"""
+    if is_enabled:
+        color = config.MENU_ENABLED_TEXT_COLOR
+    else:
+        color = config.MENU_DISABLED_TEXT_COLOR
+    return (glyphs.render(font, text, True,
+                          color, config.MENU_AREA_COLOR),
+            glyphs.render(keys_font, keys_str, True,
+                          config.MENU_KEY_COLOR,
+                          config.MENU_AREA_COLOR))
+
+def render_layout(surface, layout):
+    """Draw a menu of the given (line surface, position, keys surface,
+    position) option lines on the surface"""
+    surface.fill(config.MENU_AREA_COLOR)
+    for line_surface, line_pos, key_surface, keys_pos in layout:
+        surface.blit(line_surface, line_pos)
+        surface.blit(key_surface, keys_pos)
+    rect = pygame.Rect((0, 0), config.MENU_AREA_SIZE)
+    pygame.draw.rect(surface,
+                     config.MENU_BOUNDS_RECT_COLOR, rect,
+                     config.MENU_BOUNDS_RECT_WIDTH)
+    return surface
+
+def render_phase(surface, (texts, positions)):
+    """Draw a menu of the given phase (see Menu.phase) on the surface,
+    without its options"""
+    layout = []
+    for (is_enabled, text, keys_str, text_size, keys_text_size), (line_pos, keys_pos) in \
+            zip(texts, positions):
+        line_surface, key_surface = line_surfaces(glyphs.font(text_size),
+                                                  glyphs.font(keys_text_size),
+                                                  is_enabled, text, keys_str)
+        layout.append((line_surface, line_pos, key_surface, keys_pos))
+    return render_layout(surface, layout)
+
 class Option(object):
     def __init__(self, enabled_func, text,
                  text_size=OPTION_FONT_SIZE,
@@ -40,21 +78,16 @@ class Option(object):
         self.circle_count = 0
         self.description = description
 
+        self.text_size = text_size
+        self.keys_text_size = keys_text_size
         self.size = max(text_size, keys_text_size)
-        self.font = pygame.font.SysFont('', text_size)
-        self.keys_font = pygame.font.SysFont('', keys_text_size)
-        self._make_line_surfaces = CachedFunc(self._make_line_surfaces)
+        self.font = glyphs.font(text_size)
+        self.keys_font = glyphs.font(keys_text_size)
+        # The texts of number options change with their values
+        self._make_line_surfaces = CachedFunc(self._make_line_surfaces, max_size=4)
 
     def _make_line_surfaces(self, is_enabled, text):
-        if is_enabled:
-            color = config.MENU_ENABLED_TEXT_COLOR
-        else:
-            color = config.MENU_DISABLED_TEXT_COLOR
-        return (self.font.render(self.text(), True,
-                                 color, config.MENU_AREA_COLOR),
-                self.keys_font.render(self.keys_str(), True,
-                                      config.MENU_KEY_COLOR,
-                                      config.MENU_AREA_COLOR))
+        return line_surfaces(self.font, self.keys_font, is_enabled, self.text(), self.keys_str())
 
     def line_surfaces(self):
         return self._make_line_surfaces(self.enabled_func(), self.text())
@@ -179,7 +212,7 @@ class Menu(object):
         self.game = game
         self.options = options
         self.counter = 0
-        self.surface = pygame.Surface(config.MENU_AREA_SIZE, pygame.SWSURFACE)
+        self.surface = display_format(pygame.Surface(config.MENU_AREA_SIZE, pygame.SWSURFACE))
         self.surface.set_alpha(254 * config.MENU_ALPHA)
         
         self.enabled = False
@@ -196,29 +229,42 @@ class Menu(object):
         self.enabled = False
         self.game.update_message()
         
-    def draw(self, target_surface):
-        if not self.enabled:
-            return
-        self.surface.fill(config.MENU_AREA_COLOR)
-        rect = pygame.Rect((0, 0), config.MENU_AREA_SIZE)
-        self._draw_text()
-        pygame.draw.rect(self.surface,
-                         config.MENU_BOUNDS_RECT_COLOR, rect,
-                         config.MENU_BOUNDS_RECT_WIDTH)
-        target_surface.blit(self.surface, (0, 0))
-        self.counter += 1
-        
-    def _draw_text(self):
+    def advance(self):
+        """Advance the animation of the option texts by a frame"""
         circles_per_iteration = {
             False : config.MENU_TEXT_CIRCLE_PER_ITERATION_UNSELECTED,
             True : config.MENU_TEXT_CIRCLE_PER_ITERATION_SELECTED,
         }
-        y = 5
         for index, option in enumerate(self.options):
-            cpi = circles_per_iteration[self.selected_index == index]
-            y += self._draw_option(option, cpi, y)
+            option.circle_count += circles_per_iteration[self.selected_index == index]
+        self.counter += 1
+
+    def phase(self):
+        """Identifies what render() draws, and is enough for
+        render_phase to draw it"""
+        texts = tuple([(option.enabled_func(), option.text(), option.keys_str(),
+                        option.text_size, option.keys_text_size)
+                       for option in self.options])
+        positions = tuple([(line_pos, keys_pos)
+                           for line_surface, line_pos, key_surface, keys_pos in self._layout()])
+        return texts, positions
+
+    def render(self):
+        """Draw the menu on its (alpha) surface and return it"""
+        return render_layout(self.surface, self._layout())
+
+    def _layout(self):
+        """Return the (line surface, position, keys surface, position)
+        of each option"""
+        layout = []
+        y = 5
+        for option in self.options:
+            height, option_layout = self._option_layout(option, y)
+            layout.append(option_layout)
+            y += height
+        return layout
             
-    def _draw_option(self, option, cpi, y):
+    def _option_layout(self, option, y):
         radiusx = config.MENU_TEXT_CIRCLE_DIAMETERX/2 * option.size
         radiusy = config.MENU_TEXT_CIRCLE_DIAMETERY/2 * option.size
         diameterx = config.MENU_TEXT_CIRCLE_DIAMETERX * option.size
@@ -228,22 +274,21 @@ class Menu(object):
 
         height = max([line_surface.get_height() + diametery,
                       key_surface.get_height()])
-        option.circle_count += cpi
         width = line_surface.get_width()
         max_width = self.surface.get_width() - config.MENU_KEYS_WIDTH
         assert width < max_width
         radians = option.circle_count * math.pi * 2
         extra_x, extra_y = math.cos(radians) * radiusx, math.sin(radians) * radiusy
 
-        line_x = (max_width - width) / 2 + extra_x
-        line_y = y + (height - line_surface.get_height()) / 2 + extra_y
-        self.surface.blit(line_surface, (line_x, line_y))
+        # In whole pixels, as blitted
+        line_x = int((max_width - width) / 2 + extra_x)
+        line_y = int(y + (height - line_surface.get_height()) / 2 + extra_y)
 
-        keys_y = y + (height - key_surface.get_height()) / 2
+        keys_y = int(y + (height - key_surface.get_height()) / 2)
         keys_offsetx = config.MENU_AREA_SIZE[0] - config.MENU_KEYS_WIDTH
-        self.surface.blit(key_surface, (keys_offsetx, keys_y))
         
-        return height
+        return height, (line_surface, (line_x, line_y),
+                        key_surface, (keys_offsetx, keys_y))
     
     def handle_pygame_event(self, event):
         if self.enabled:
@@ -0,0 +1,222 @@
+import numpy
+import Canvas
+from CachedFunc import CachedFunc
+
+INITIAL_SLOT_CAPACITY = 16
+NO_IDS = numpy.empty(0, numpy.int32)
+NO_ROWS = numpy.empty((4, 0), numpy.int32)
+
+class Slot(object):
+    """The circles of a single canvas slot, as parallel numpy arrays.
+
+    Only the first `count` items of each array are valid.  The arrays
+    are the rows of a single one, so all of them can be copied at once.
+    """
+    def __init__(self):
+        self.count = 0
+        self._set_rows(numpy.empty((4, INITIAL_SLOT_CAPACITY), numpy.int32))
+
+    def _set_rows(self, rows):
+        self.rows = rows
+        self.xs, self.ys, self.diameters, self.ids = rows
+
+    def _grow(self):
+        rows = numpy.empty((4, 2*len(self.ids)), numpy.int32)
+        rows[:, :self.count] = self.rows[:, :self.count]
+        self._set_rows(rows)
+
+    def append(self, circle_id, x, y, diameter):
+        if self.count == len(self.ids):
+            self._grow()
+        index = self.count
+        self.xs[index] = x
+        self.ys[index] = y
+        self.diameters[index] = diameter
+        self.ids[index] = circle_id
+        self.count += 1
+
+    def remove(self, circle_id):
+        index, = numpy.flatnonzero(self.ids[:self.count] == circle_id)
+        last = self.count - 1
+        # Move the last item into the hole
+        self.rows[:, index] = self.rows[:, last]
+        self.count = last
+
+    def collision_ids(self, (x, y), diameter):
+        """Return the ids of the circles colliding with the given circle.
+
+        Mirrors Canvas.overlapping exactly.
+        """
+        count = self.count
+        dx = self.xs[:count] - x
+        dy = self.ys[:count] - y
+        diameters = self.diameters[:count]
+        close = dx*dx + dy*dy <= ((diameters + diameter)//2)**2
+        if not close.any():
+            return NO_IDS
+        # Few circles pass the distance test, so the bounding rects
+        # (relative to the query position) are tested only on them
+        diameters = diameters[close]
+        halves = diameters//2
+        lefts = dx[close] - halves
+        tops = dy[close] - halves
+        half = diameter//2
+        mask = ((lefts < diameter - half) & (lefts + diameters > -half) &
+                (tops < diameter - half) & (tops + diameters > -half))
+        return self.ids[:count][close][mask]
+
+    def capsule_ids(self, (x1, y1), (x2, y2), diameter):
+        """Return the ids of the circles colliding with a circle of the
+        given diameter sliding from (x1, y1) to (x2, y2)."""
+        count = self.count
+        xs = self.xs[:count] - x1
+        ys = self.ys[:count] - y1
+        dx = x2 - x1
+        dy = y2 - y1
+        sqr_length = dx*dx + dy*dy
+        if sqr_length:
+            parts = numpy.clip((xs*dx + ys*dy) / sqr_length, 0.0, 1.0)
+            xs = xs - parts*dx
+            ys = ys - parts*dy
+        reaches = (self.diameters[:count] + diameter) / 2.0
+        return self.ids[:count][xs*xs + ys*ys <= reaches*reaches]
+
+def capsule_values(((x1, y1), (x2, y2), diameter)):
+    """Return the start, direction, length**2 (infinite when not
+    moving, as the start is the nearest point then) and diameter of a
+    capsule"""
+    dx = x2 - x1
+    dy = y2 - y1
+    return x1, y1, dx, dy, dx*dx + dy*dy or numpy.inf, diameter
+
+def window_offsets(area_width, width, height):
+    """The offsets of the pixels of a window of the size from its top
+    left pixel, in an area of the width"""
+    return ((numpy.arange(height)*area_width)[:, None] + numpy.arange(width)).ravel()
+window_offsets = CachedFunc(window_offsets, max_size=16)
+
+class NumpyCanvas(Canvas.Canvas):
+    """A Canvas that keeps each slot in numpy arrays and tests a whole
+    slot at once, and the candidates of a batch of capsules in a
+    single pass."""
+    # numpy has a high per-call overhead, so fewer larger slots are better
+    slot_diameters = 16
+    slot_cost = 40.0
+    candidate_cost = 0.1
+    batch_queries = True
+
+    def _clear_index(self):
+        self._slot_of_key = {}
+
+    def _index(self, circle_id, x, y):
+        slot_key = self._slot_key(x, y)
+        slot = self._slot_of_key.get(slot_key)
+        if slot is None:
+            slot = self._slot_of_key[slot_key] = Slot()
+        slot.append(circle_id, x, y, self._diameters[circle_id])
+
+    def _unindex(self, circle_id, x, y):
+        self._slot_of_key[self._slot_key(x, y)].remove(circle_id)
+
+    def _slots(self, slot_keys):
+        self._query_count += 1
+        for slot_key in slot_keys:
+            self._slot_visit_count += 1
+            slot = self._slot_of_key.get(slot_key)
+            if slot is not None and slot.count:
+                self._candidate_count += slot.count
+                yield slot
+
+    def _live_collisions(self, position, diameter):
+        result = []
+        for slot in self._slots(self._slot_keys_of_reach(position, self._reach(diameter))):
+            result.extend(slot.collision_ids(position, diameter).tolist())
+        return result
+
+    def _live_in_rect(self, rect):
+        reach = self._max_diameter/2 + 1
+        result = []
+        for slot_key in self._slot_keys_of_rect(rect.inflate(2*reach, 2*reach)):
+            slot = self._slot_of_key.get(slot_key)
+            if slot is not None:
+                result.extend(slot.ids[:slot.count].tolist())
+        return [circle_id for circle_id in result
+                if self._bounding_rect(circle_id).colliderect(rect)]
+
+    def _live_candidates(self, rects):
+        """Return the rows (see Slot) of the circles in the slots of any
+        of the rects, gathered from each slot once"""
+        slots = {}
+        for rect in rects:
+            for slot in self._slots(self._slot_keys_of_rect(rect)):
+                slots[id(slot)] = slot
+        if not slots:
+            return NO_ROWS
+        return numpy.concatenate([slot.rows[:, :slot.count] for slot in slots.itervalues()],
+                                 axis=1)
+
+    def _trail_candidates(self, capsules):
+        """Return the rows (like those of a Slot) of the baked circles
+        near any of the capsules.
+
+        The capsule rects of each layer are gathered at once, as
+        windows of the size of the largest of them."""
+        trail = self._trail
+        width, height = self.area_rect.size
+        parts = [NO_ROWS]
+        for layer, (other_diameter, owners) in enumerate(self.trail_layers()):
+            rects = [Canvas.capsule_rect(start, end, (diameter + other_diameter)/2.0)
+                     for start, end, diameter in capsules]
+            window_width = min(width, max([rect.width for rect in rects]))
+            window_height = min(height, max([rect.height for rect in rects]))
+            offsets = window_offsets(width, window_width, window_height)
+            trail.scanned_area += len(rects)*len(offsets)
+            window_pixels = (numpy.array([
+                min(max(rect.top, 0), height - window_height)*width +
+                min(max(rect.left, 0), width - window_width)
+                for rect in rects])[:, None] + offsets).ravel()
+            found, = numpy.frombuffer(owners, numpy.uint8).take(window_pixels).nonzero()
+            if not len(found):
+                continue
+            # The windows may overlap
+            pixels = numpy.unique(window_pixels[found])
+            trail.candidate_count += len(pixels)
+            parts.append([pixels % width, pixels // width,
+                          numpy.repeat(other_diameter, len(pixels)),
+                          trail.id_of(layer, pixels)])
+        if len(parts) == 1:
+            return NO_ROWS
+        return numpy.concatenate(parts, axis=1)
+
+    def _batch_capsule_collisions(self, capsules):
+        """Test the candidates of all of the capsules in a single pass,
+        like Slot.capsule_ids does for one.  Every candidate is tested
+        with every capsule, those not found near it are too far to
+        collide with it."""
+        if not capsules:
+            return []
+        rects = [Canvas.capsule_rect(start, end, (diameter + self._max_diameter)/2.0)
+                 for start, end, diameter in capsules]
+        xs, ys, diameters, ids = numpy.concatenate(
+            [self._live_candidates(rects), self._trail_candidates(capsules)], axis=1)
+        # A column per capsule
+        x1s, y1s, dxs, dys, sqr_lengths, capsule_diameters = numpy.array(
+            [capsule_values(capsule) for capsule in capsules]).T[:, :, None]
+        xs = xs - x1s
+        ys = ys - y1s
+        parts = numpy.minimum(numpy.maximum((xs*dxs + ys*dys) / sqr_lengths, 0.0), 1.0)
+        xs -= parts*dxs
+        ys -= parts*dys
+        reaches = (diameters + capsule_diameters) / 2.0
+        hit = xs*xs + ys*ys <= reaches*reaches
+        # Row by row, the hits of each capsule are together
+        hit_ids = ids[hit.nonzero()[1]].tolist()
+        bounds = [0] + hit.sum(axis=1).cumsum().tolist()
+        return [hit_ids[bounds[index]:bounds[index + 1]] for index in xrange(len(capsules))]
+
+    def _live_capsule_collisions(self, start, end, diameter):
+        rect = Canvas.capsule_rect(start, end, (diameter + self._max_diameter)/2.0)
+        result = []
+        for slot in self._slots(self._slot_keys_of_rect(rect)):
+            result.extend(slot.capsule_ids(start, end, diameter).tolist())
+        return result
@@ -0,0 +1,66 @@
+import numpy
+from Canvas import FREE
+from Fog import Fog
+
+class NumpyFog(Fog):
+    """A Fog that goes over arrays of all the circles of the canvas at
+    once, instead of querying it for each viewer"""
+    def _circle_arrays(self):
+        """Return the xs, ys, diameters and owners of all the circles"""
+        canvas = self._worm_area.canvas
+        positions, diameters, owners = [numpy.frombuffer(values, numpy.intc)
+                                        for values in canvas.records()]
+        live = owners != FREE
+        positions = positions[live]
+        xs = [positions & 0xFFFF]
+        ys = [positions >> 16]
+        all_diameters = [diameters[live]]
+        all_owners = [owners[live]]
+        width = canvas.area_rect.width
+        for diameter, layer_owners in canvas.trail_layers():
+            layer_owners = numpy.frombuffer(layer_owners, numpy.uint8)
+            pixels = numpy.flatnonzero(layer_owners)
+            xs.append(pixels % width)
+            ys.append(pixels // width)
+            all_diameters.append(numpy.repeat(diameter, len(pixels)))
+            all_owners.append(layer_owners[pixels].astype(numpy.intc) - 1)
+        return [numpy.concatenate(values).astype(numpy.intc)
+                for values in (xs, ys, all_diameters, all_owners)]
+
+    def _groups(self, viewer_positions, vision_diameter):
+        xs, ys, diameters, owners = self._circle_arrays()
+        # The Canvas collision test of each circle with each vision
+        # circle
+        lefts = xs - diameters//2
+        tops = ys - diameters//2
+        sqr_reaches = ((diameters + vision_diameter)//2)**2
+        sqr_distances = numpy.empty(len(xs))
+        sqr_distances.fill(numpy.inf)
+        for x, y in viewer_positions:
+            vision_x = int(x)
+            vision_y = int(y)
+            vision_left = vision_x - vision_diameter/2
+            vision_top = vision_y - vision_diameter/2
+            seen = ((vision_left < lefts + diameters) & (lefts < vision_left + vision_diameter) &
+                    (vision_top < tops + diameters) & (tops < vision_top + vision_diameter) &
+                    ((xs - vision_x)**2 + (ys - vision_y)**2 <= sqr_reaches))
+            numpy.minimum(sqr_distances, numpy.where(seen, (xs - x)**2 + (ys - y)**2, numpy.inf),
+                          sqr_distances)
+        seen = numpy.flatnonzero(sqr_distances != numpy.inf)
+        sqr_vision_radius = (vision_diameter/2)**2
+        fades = 1.0 - numpy.minimum(1.0, sqr_distances[seen] / float(sqr_vision_radius))
+        levels = (fades * self.fade_levels).astype(numpy.intc)
+
+        order = numpy.lexsort((diameters[seen], owners[seen], levels))
+        seen = seen[order]
+        keys = numpy.column_stack((levels[order], owners[seen], diameters[seen]))
+        starts = numpy.flatnonzero(numpy.any(keys[1:] != keys[:-1], axis=1)) + 1
+        groups = []
+        for start, end in zip([0] + starts.tolist(), starts.tolist() + [len(seen)]):
+            if start == end:
+                continue
+            group = seen[start:end]
+            level, owner, diameter = keys[start].tolist()
+            groups.append((level, owner, diameter,
+                           zip(xs[group].tolist(), ys[group].tolist())))
+        return groups
@@ -0,0 +1,55 @@
+import pygame
+
+class Overlays(object):
+    """The layers blended over the rest of the display.
+
+    The display keeps the blended pixels, and an overlay is blended
+    again only where it changed, or where what is below it was redrawn.
+    Each overlay is given as a (name, key, rect, surface_func), where
+    the key identifies its content and animation phase, so that
+    surface_func is only called again when it changes.  The surface is
+    blitted at the topleft of the rect, clipped to it.
+    """
+    def __init__(self):
+        # name -> (key, rect, surface) of the overlays drawn last
+        self._drawn = {}
+
+    def draw(self, display, overlays, dirty_rects, restore):
+        """Blend the given overlays, bottom first, over the display and
+        add the rects it changed to the DirtyRects.  restore(rect) must
+        redraw all that is below the overlays in the rect."""
+        old = self._drawn
+        self._drawn = {}
+        layers = []
+        changed_rects = []
+        for name, key, rect, surface_func in overlays:
+            rect = pygame.Rect(rect)
+            if name in old and old[name][0] == key and old[name][1] == rect:
+                key, rect, surface = old.pop(name)
+            else:
+                surface = surface_func()
+                changed_rects.append(rect)
+            self._drawn[name] = key, rect, surface
+            layers.append((rect, surface))
+        # Changed and removed overlays must be cleared where they were
+        changed_rects.extend([rect for key, rect, surface in old.itervalues()])
+
+        if dirty_rects.is_all():
+            # All that is below them was just redrawn
+            self._blend(display, layers, display.get_rect())
+            return
+        below_rects = []
+        for rect, surface in layers:
+            below_rects.extend(dirty_rects.clipped(rect))
+        for rect in changed_rects + below_rects:
+            restore(rect)
+            self._blend(display, layers, rect)
+            dirty_rects.add(rect)
+
+    def _blend(self, display, layers, rect):
+        for layer_rect, surface in layers:
+            clip = layer_rect.clip(rect)
+            if clip:
+                display.set_clip(clip)
+                display.blit(surface, layer_rect.topleft)
+        display.set_clip(None)
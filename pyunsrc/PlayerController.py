@@ -37,3 +37,22 @@ class PlayerController(object):
     def control_str(self):
         keys_strs = (key_name(self.left_key), key_name(self.right_key))
         return '%s %s' % keys_strs
+
+class ScriptedPlayerController(PlayerController):
+    """Steers the player by random keys states rather than by keys, for
+    benchmarks"""
+    # The keys states switched to, and the chance of switching each tick
+    KEYS_STATES = (0, LEFT, RIGHT)
+    SWITCH_CHANCE = 10
+    def __init__(self, player, random):
+        PlayerController.__init__(self, player, ((0, None), (0, None)))
+        self._random = random
+    def handle_pygame_event(self, event):
+        return False
+    def advance(self):
+        """Maybe switch to another keys state, once a tick"""
+        if self._random.randrange(self.SWITCH_CHANCE) == 0:
+            self.current_keys_state = self.KEYS_STATES[
+                self._random.randrange(len(self.KEYS_STATES))]
+    def control_str(self):
+        return 'scripted'
@@ -0,0 +1,151 @@
+import os
+import cPickle as pickle
+import multiprocessing
+from multiprocessing.sharedctypes import RawArray, RawValue
+from Queue import Empty
+import pygame
+from configfile import config
+from log import warning
+from Renderer import Renderer
+
+# The ints of a trail circle in the ring: x, y, diameter and owner
+CIRCLE_INTS = 4
+
+# The attributes of the forwarded events
+EVENT_ATTRIBUTES = {
+    pygame.KEYDOWN: ('key', 'mod', 'unicode'),
+    pygame.KEYUP: ('key', 'mod'),
+    pygame.QUIT: (),
+}
+
+class RenderProcess(object):
+    """A process that owns the window and draws the game, from the
+    snapshots of it published by the main process in shared memory.
+
+    The latest snapshot (of the worms, the Hud state, the texts, menus
+    and so on, see Game._snapshot) is pickled into a shared buffer,
+    replacing the previous one if the renderer did not read it yet.
+    The new trail circles are appended to a shared ring, as the
+    renderer keeps its own canvas of them.  Circles the renderer falls
+    more than RENDER_PROCESS_CIRCLES behind on are lost, and snapshots
+    larger than RENDER_PROCESS_SNAPSHOT_SIZE are skipped, the renderer
+    keeps drawing the last one until one fits.  The key events of the
+    window are sent back through a queue.
+
+    It must be created before pygame is initialized in the main
+    process, which has no window then.
+    """
+    def __init__(self):
+        self._capacity = config.RENDER_PROCESS_CIRCLES
+        self._circles = RawArray('i', self._capacity*CIRCLE_INTS)
+        # The number of circles ever published
+        self._circle_count = RawValue('l', 0)
+        self._new_circles = []
+        self._snapshot = RawArray('c', config.RENDER_PROCESS_SNAPSHOT_SIZE)
+        self._snapshot_size = RawValue('l', 0)
+        # The number of snapshots ever published
+        self._snapshot_count = RawValue('l', 0)
+        # Whether the last snapshot was skipped, to warn once of a run
+        # of them
+        self._skipped_snapshot = False
+        self._lock = multiprocessing.Lock()
+        self._events = multiprocessing.Queue()
+        self._running = RawValue('b', 1)
+        self._main_pid = os.getpid()
+        self._process = multiprocessing.Process(target=_render, args=(self,))
+        self._process.daemon = True
+        self._process.start()
+
+    def _ring_parts(self, start_count, end_count):
+        """Return the (offset from the start, ring index, length) of the
+        contiguous parts of the ring holding the circles between the
+        counts"""
+        parts = []
+        count = start_count
+        while count < end_count:
+            index = count % self._capacity
+            length = min(end_count - count, self._capacity - index)
+            parts.append((count - start_count, index, length))
+            count += length
+        return parts
+
+    # The main process's side
+
+    def circle_count(self):
+        """The number of circles published so far"""
+        return self._circle_count.value
+
+    def add_circles(self, owner, diameter, positions):
+        """Add the new trail circles to the next publication"""
+        self._new_circles.extend([(x, y, diameter, owner) for x, y in positions])
+
+    def publish(self, snapshot):
+        data = pickle.dumps(snapshot, pickle.HIGHEST_PROTOCOL)
+        fits = len(data) <= len(self._snapshot)
+        if not fits and not self._skipped_snapshot:
+            warning("Skipping snapshots of %d bytes, larger than RENDER_PROCESS_SNAPSHOT_SIZE" %
+                    (len(data),))
+        self._skipped_snapshot = not fits
+        ints = [i for circle in self._new_circles for i in circle]
+        with self._lock:
+            count = self._circle_count.value
+            for start, index, length in self._ring_parts(count, count + len(self._new_circles)):
+                self._circles[index*CIRCLE_INTS:(index+length)*CIRCLE_INTS] = \
+                    ints[start*CIRCLE_INTS:(start+length)*CIRCLE_INTS]
+            self._circle_count.value = count + len(self._new_circles)
+            # The renderer reads the circles along with the next
+            # snapshot that fits
+            if fits:
+                self._snapshot[:len(data)] = data
+                self._snapshot_size.value = len(data)
+                self._snapshot_count.value += 1
+        self._new_circles = []
+
+    def events(self):
+        """Return the events sent by the renderer since the last call"""
+        events = []
+        while True:
+            try:
+                event_type, attributes = self._events.get_nowait()
+            except Empty:
+                return events
+            events.append(pygame.event.Event(event_type, attributes))
+
+    def close(self):
+        self._running.value = 0
+        self._process.join()
+
+    # The renderer's side
+
+    def is_running(self):
+        # Until closed, or the main process died without closing it
+        return bool(self._running.value) and os.getppid() == self._main_pid
+
+    def send_event(self, event):
+        if event.type in EVENT_ATTRIBUTES:
+            self._events.put((event.type, dict([(name, getattr(event, name))
+                                                for name in EVENT_ATTRIBUTES[event.type]])))
+
+    def read(self, snapshot_count, circle_count):
+        """Return the (snapshot count, snapshot, circle count, first
+        circle count, circles) of the latest snapshot if newer than the
+        snapshot count, and the circles since the circle count, or None"""
+        with self._lock:
+            new_snapshot_count = self._snapshot_count.value
+            if new_snapshot_count == snapshot_count:
+                return None
+            data = self._snapshot[:self._snapshot_size.value]
+            new_circle_count = self._circle_count.value
+            first = max(circle_count, new_circle_count - self._capacity)
+            ints = []
+            for start, index, length in self._ring_parts(first, new_circle_count):
+                ints.extend(self._circles[index*CIRCLE_INTS:(index+length)*CIRCLE_INTS])
+        if first > circle_count:
+            warning("The renderer lost %d trail circles" % (first - circle_count,))
+        return (new_snapshot_count, pickle.loads(data), new_circle_count, first,
+                [tuple(ints[index:index+CIRCLE_INTS])
+                 for index in xrange(0, len(ints), CIRCLE_INTS)])
+
+def _render(render_process):
+    pygame.init()
+    Renderer(render_process).run()
@@ -0,0 +1,198 @@
+import time
+import pygame
+import Menu
+import configfile
+import DictAttrAccessor
+
+from configfile import config
+from Bunch import Bunch
+from util import display_format
+
+from Screen import Screen
+from Hud import Hud
+from Worm import Worm
+from WormArea import WormArea
+from Credits import Credits
+from Governor import OPTIONAL_WORK
+
+class WormView(Worm):
+    """A worm of the snapshots, drawn like a Worm"""
+    # Set from the snapshots, rather than read from a WormSet
+    position = None
+
+    def __init__(self, net_config, owner, color):
+        self.net_config = net_config
+        self.owner = owner
+        self.color = color
+        self.hole_circle = None
+        self._eyes = []
+        self.motion = (0, 0)
+        self.circles_to_draw = []
+
+    def set_overlay_state(self, (hole_circle, eyes, motion)):
+        self.hole_circle = hole_circle
+        self._eyes = list(eyes)
+        self.motion = motion
+
+class HudView(Hud):
+    """The Hud of the snapshots"""
+    def state(self):
+        return self.game.hud_state
+
+class MenuView(object):
+    """A menu of the snapshots, drawn from its phase"""
+    def __init__(self):
+        self.surface = display_format(pygame.Surface(config.MENU_AREA_SIZE, pygame.SWSURFACE))
+        self.surface.set_alpha(254 * config.MENU_ALPHA)
+        self._phase = None
+
+    def is_enabled(self):
+        return True
+
+    def phase(self):
+        return self._phase
+
+    def set_phase(self, phase):
+        self._phase = phase
+
+    def render(self):
+        return Menu.render_phase(self.surface, self._phase)
+
+class Renderer(Screen):
+    """Draws the snapshots of the game published through a
+    RenderProcess, in its process.
+
+    The worm area and Hud read the same of the renderer as of a Game,
+    and it keeps a canvas of the trail circles for the fog and for
+    repainting the trail.
+    """
+    headless = False
+    # The menus and credits are shown at the frames of the snapshots
+    optional_work = [work for work in OPTIONAL_WORK
+                     if work not in ('menu animation', 'credits')]
+
+    def __init__(self, render_process):
+        self._render_process = render_process
+        self._snapshot_count = self._circle_count = 0
+        self._frame_count = 0
+        self._scheduler = pygame.time.Clock()
+        self.net_config = DictAttrAccessor.DictAttrAccessor(configfile.default_net_config.copy())
+        self._players = []
+        self._worms = {}
+        self._chosen_player = None
+        # The WormArea asks the controller for the chosen player
+        self.controller = self
+        self.hud_state = None
+        self._snapshot_tick_fraction = 0.0
+
+        self._init_screen()
+        self.set_text('')
+        self.hud = HudView(self)
+        self.worm_area = WormArea(self, self.worm_area_surface)
+        self._round = None
+        self._instructions_lines = None
+        self.menus = {}
+        self.credits = None
+
+    def all_players(self):
+        return self._players
+
+    def is_local_player(self, player):
+        return player.local
+
+    def chosen_player(self):
+        return self._chosen_player
+
+    def _tick_fraction(self):
+        return self._snapshot_tick_fraction
+
+    def run(self):
+        governor = self._governor
+        while self._render_process.is_running():
+            for event in pygame.event.get():
+                self._render_process.send_event(event)
+            update = self._render_process.read(self._snapshot_count, self._circle_count)
+            # The game publishes a snapshot per frame, with its
+            # tick_fraction, so redrawing one would draw the same
+            if update is not None:
+                self._snapshot_count, snapshot, self._circle_count, first, circles = update
+                self._apply(snapshot, first, circles)
+                start = time.time()
+                self._frame_count += 1
+                self._draw()
+                governor.measure('frame', time.time() - start)
+                governor.frame_done(1.0 / config.MAX_FRAMES_PER_SECOND)
+            self._scheduler.tick(config.MAX_FRAMES_PER_SECOND)
+
+    def _apply(self, snapshot, first, circles):
+        """Take the state of the snapshot, and the trail circles since
+        the last one, starting with the first (circle count) of them"""
+        old_diameter = self.net_config.DIAMETER
+        for name, value in snapshot['net_config'].iteritems():
+            setattr(self.net_config, name, value)
+        round, round_start = snapshot['round']
+        if round != self._round:
+            self._round = round
+            self.worm_area.clear()
+            for worm in self._worms.itervalues():
+                worm.discard_drawing()
+        elif self.net_config.DIAMETER != old_diameter:
+            self.worm_area.diameter_changed()
+        owner_colors = snapshot['owner_colors']
+        if owner_colors != self.worm_area.owner_colors():
+            # Added, or reused by another worm
+            self.worm_area.set_owner_colors(owner_colors)
+
+        self._players = []
+        self._chosen_player = None
+        for owner, position, overlay_state, alive, local, chosen in snapshot['worms']:
+            worm = self._worms.get(owner)
+            if worm is None:
+                worm = self._worms[owner] = WormView(self.net_config, owner, owner_colors[owner])
+            worm.color = owner_colors[owner]
+            worm.position = position
+            worm.set_overlay_state(overlay_state)
+            player = Bunch(worm=worm, alive=alive, local=local)
+            self._players.append(player)
+            if chosen:
+                self._chosen_player = player
+
+        canvas = self.worm_area.canvas
+        for count, (x, y, diameter, owner) in enumerate(circles, first):
+            if count < round_start:
+                # Of an older round
+                continue
+            canvas.add((x, y), diameter, owner, 0)
+            if owner in self._worms:
+                self._worms[owner].circles_to_draw.append((x, y))
+
+        self._snapshot_tick_fraction = snapshot['tick_fraction']
+        self.hud_state = snapshot['hud']
+        if snapshot['text'] != self.get_text():
+            self.set_text(snapshot['text'])
+        self._texts = list(snapshot['texts'])
+        lines = snapshot['instructions']
+        if lines is None:
+            self._instructions_lines = None
+        else:
+            self._instructions_lines = lambda: lines
+        menus = {}
+        for name, phase in snapshot['menus']:
+            menus[name] = self.menus.get(name) or MenuView()
+            menus[name].set_phase(phase)
+        self.menus = menus
+        self._apply_credits(snapshot['credits'])
+        if snapshot['fullscreen'] != self.is_fullscreen():
+            self.set_fullscreen(snapshot['fullscreen'])
+
+    def _apply_credits(self, frame):
+        """Show the credits advanced to the frame, or none if None"""
+        if frame is None:
+            if self.credits is not None:
+                self.credits = None
+                self._dirty_rects.set_all()
+            return
+        if self.credits is None or self.credits.frame > frame:
+            self.credits = Credits(self)
+        while self.credits.frame < frame:
+            self.credits.advance()
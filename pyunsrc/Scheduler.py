@@ -0,0 +1,128 @@
+import time
+from collections import deque
+from configfile import config
+
+# The number of recent frames the frame rate is averaged over
+FPS_FRAMES = 10
+
+class Scheduler(object):
+    """Paces the simulation ticks and the frames by the wall clock.
+
+    Ticks fall due at a fixed interval, whatever the frame rate.  When
+    the simulation is behind, the due ticks are run back to back and
+    no frames are rendered until it catches up, unless it is more than
+    MAX_SIMULATION_LAG seconds behind, in which case the lost time is
+    dropped.  Frames are rendered at most MAX_FRAMES_PER_SECOND times a
+    second, and draw the worms ahead of the last tick by the
+    tick_fraction since it.  Unless FRAMES_ABOVE_TICK_RATE, a frame is
+    only rendered once a tick ran since the last one, which caps the
+    frame rate at the tick rate.
+    """
+    def __init__(self, timer=time.time):
+        self._timer = timer
+        now = timer()
+        self._next_tick = now
+        self._next_frame = now
+        self._frame_times = deque([now])
+        self._tick_interval = None
+        # Whether a tick ran since the last frame
+        self._ticked = False
+
+    def _frame_has_news(self):
+        return self._ticked or config.FRAMES_ABOVE_TICK_RATE
+
+    def tick_due(self, tick_interval):
+        """Return whether a tick is due, counting it as run if so"""
+        now = self._timer()
+        if now < self._next_tick:
+            return False
+        if now - self._next_tick > config.MAX_SIMULATION_LAG:
+            self._next_tick = now
+        self._next_tick += tick_interval
+        self._tick_interval = tick_interval
+        self._ticked = True
+        return True
+
+    def tick_fraction(self):
+        """The fraction of the tick interval passed since the last tick
+        was due, from 0 to 1"""
+        if self._tick_interval is None:
+            return 0.0
+        passed = self._tick_interval - (self._next_tick - self._timer())
+        return min(1.0, max(0.0, passed / self._tick_interval))
+
+    def frame_due(self):
+        """Return whether a frame is due, counting it as rendered if so"""
+        now = self._timer()
+        if now < self._next_frame or now >= self._next_tick or not self._frame_has_news():
+            return False
+        self._ticked = False
+        frame_interval = 1.0 / config.MAX_FRAMES_PER_SECOND
+        self._next_frame += frame_interval
+        if self._next_frame < now:
+            # Late frames are not made up for
+            self._next_frame = now + frame_interval
+        self._frame_times.append(now)
+        if len(self._frame_times) > FPS_FRAMES:
+            self._frame_times.popleft()
+        return True
+
+    def get_fps(self):
+        """The rate of the recent frames, like pygame.time.Clock's"""
+        duration = self._frame_times[-1] - self._frame_times[0]
+        if duration <= 0:
+            return 0.0
+        return (len(self._frame_times) - 1) / duration
+
+    def wait(self):
+        """Wait until the next tick or frame is due.  Sleeping is only
+        precise to the OS's time slice, so the end of the wait is spun."""
+        deadline = self._next_tick
+        if self._frame_has_news():
+            deadline = min(deadline, self._next_frame)
+        remaining = deadline - self._timer()
+        if remaining > config.SCHEDULER_SPIN_TIME:
+            time.sleep(remaining - config.SCHEDULER_SPIN_TIME)
+        while self._timer() < deadline:
+            pass
+
+class UnpacedScheduler(Scheduler):
+    """Runs the ticks back to back, as fast as they go, without waiting
+    for the wall clock, with a frame after each tick.  For games with
+    no network peers to keep pace with, such as benchmarks.
+
+    While paused() (the game waits for its players), nothing runs
+    faster for it, so it keeps the pace of a Scheduler rather than
+    spinning."""
+    def __init__(self, paused, timer=time.time):
+        Scheduler.__init__(self, timer)
+        self._paused = paused
+        self._tick_run = False
+
+    def tick_due(self, tick_interval):
+        if self._paused():
+            return Scheduler.tick_due(self, tick_interval)
+        if self._tick_run:
+            return False
+        self._tick_run = True
+        # Paced from the last tick when paused
+        self._next_tick = self._timer() + tick_interval
+        self._tick_interval = tick_interval
+        return True
+
+    def tick_fraction(self):
+        # The frames are right after the ticks
+        return 0.0
+
+    def frame_due(self):
+        if self._paused():
+            return Scheduler.frame_due(self)
+        self._frame_times.append(self._timer())
+        if len(self._frame_times) > FPS_FRAMES:
+            self._frame_times.popleft()
+        return True
+
+    def wait(self):
+        self._tick_run = False
+        if self._paused():
+            Scheduler.wait(self)
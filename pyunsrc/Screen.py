@@ -0,0 +1,324 @@
+import time
+import pygame
+import instructions
+import glyphs
+
+from configfile import config
+from util import font_height, display_format
+
+from DirtyRects import DirtyRects
+from Governor import Governor, OPTIONAL_WORK
+from Overlays import Overlays
+
+class Screen(object):
+    """Draws the display of a game.
+
+    The display is always of the DISPLAY_MODE size everything is laid
+    out in.  When the window is of another size (see WINDOW_SIZE), the
+    display is an offscreen surface, presented in the window with a
+    scaled blit, keeping its aspect ratio.
+
+    A subclass provides the headless flag, the worm_area, hud, menus,
+    credits and _instructions_lines shown, the _scheduler whose frame
+    rate is shown and the _frame_count, and calls _init_screen.  The
+    Game draws its own state, and a Renderer the snapshots of a game
+    in another process (see RenderProcess).
+    """
+    # The optional work the Governor may drop
+    optional_work = OPTIONAL_WORK
+
+    def _init_screen(self):
+        self._display_flags = 0
+        if config.DISPLAY_DOUBLE_BUFFER:
+            self._display_flags |= pygame.DOUBLEBUF | pygame.HWSURFACE
+        self._dirty_rects = DirtyRects(config.DISPLAY_MODE)
+        self._overlays = Overlays()
+        self._governor = Governor(self.optional_work)
+        self._last_fps_text = self._last_text_surface = None
+        self._setup_display()
+
+        self.worm_area_surface = display_format(
+            pygame.Surface(config.WORM_AREA_SIZE, pygame.SWSURFACE))
+
+        self._init_font()
+        self._init_text()
+
+    def is_fullscreen(self):
+        return bool(self._display_flags & pygame.FULLSCREEN)
+
+    def set_fullscreen(self, value):
+        self._display_flags &= ~pygame.FULLSCREEN
+        if value:
+            self._display_flags |= pygame.FULLSCREEN
+        if self.headless:
+            return
+        size = self.display.get_size()
+        copy = pygame.Surface(size, pygame.SWSURFACE)
+        copy.blit(self.display, (0, 0))
+        pygame.display.quit()
+        pygame.display.init()
+        self._setup_display()
+        self.display.blit(copy, (0, 0))
+
+    def get_text(self):
+        return self._current_text
+
+    def set_text(self, text):
+        self._current_text = text
+        self._current_text_surface = glyphs.render(self._font, text, True, config.TEXT_COLOR)
+
+    def _init_font(self):
+        self._font = glyphs.font(config.TEXT_FONT_SIZE)
+        self._texts_font = glyphs.font(config.TEXTS_FONT_SIZE)
+
+    def _init_text(self):
+        self._texts = []
+
+    def _window_size(self):
+        if self.is_fullscreen() and config.FULLSCREEN_SIZE is not None:
+            return config.FULLSCREEN_SIZE
+        return config.WINDOW_SIZE or config.DISPLAY_MODE
+
+    def _setup_display(self):
+        self._window = None
+        if self.headless:
+            self.display = pygame.Surface(config.DISPLAY_MODE, pygame.SWSURFACE)
+        else:
+            window = pygame.display.set_mode(self._window_size(), self._display_flags)
+            if window.get_size() == tuple(config.DISPLAY_MODE):
+                self.display = window
+            else:
+                self._setup_window(window)
+        self.hud_area = self.display.subsurface((config.HUD_AREA_POS, config.HUD_AREA_SIZE))
+        self._dirty_rects.set_all()
+
+    def _setup_window(self, window):
+        """Present the display in the window, in the largest rect of its
+        aspect ratio the window holds"""
+        self._window = window
+        width, height = config.DISPLAY_MODE
+        window_width, window_height = window.get_size()
+        scale = min(float(window_width) / width, float(window_height) / height)
+        view_rect = self._view_rect = pygame.Rect((0, 0), (int(width*scale), int(height*scale)))
+        view_rect.center = window.get_rect().center
+        self._view = window.subsurface(view_rect)
+        self._border_rects = [rect for rect in [
+            pygame.Rect((0, 0), (window_width, view_rect.top)),
+            pygame.Rect((0, view_rect.bottom), (window_width, window_height - view_rect.bottom)),
+            pygame.Rect((0, view_rect.top), (view_rect.left, view_rect.height)),
+            pygame.Rect(view_rect.topright, (window_width - view_rect.right, view_rect.height)),
+        ] if rect.width and rect.height]
+        self._fill_borders()
+        # Integer scales are pixel replication, which each rect can
+        # be scaled by alone
+        self._integer_scale = None
+        if (self._view_rect.width % width == 0 and self._view_rect.height % height == 0 and
+            not config.WINDOW_SMOOTH_SCALE):
+            self._integer_scale = self._view_rect.width // width, self._view_rect.height // height
+        self.display = display_format(pygame.Surface(config.DISPLAY_MODE, pygame.SWSURFACE))
+
+    def _draw(self):
+        self._expire_texts()
+        self._draw_worm_area()
+        hud_rects = self._draw_hud()
+        if self._dirty_rects.is_all() or hud_rects:
+            self._draw_bounds_rect()
+        self._draw_text()
+        self._draw_fps()
+        self._overlays.draw(self.display, self._overlay_layers(), self._dirty_rects,
+                            self._restore_below_overlays)
+
+        rects = self._dirty_rects.pop()
+        if self.headless:
+            # Rendered offscreen only
+            return
+        if self._window is not None:
+            rects = self._present(rects)
+        if self._display_flags & pygame.DOUBLEBUF:
+            pygame.display.flip()
+            self._dirty_rects.set_all()
+        elif rects is None:
+            pygame.display.update()
+        else:
+            pygame.display.update(rects)
+
+    def _fill_borders(self):
+        for rect in self._border_rects:
+            self._window.fill(config.CLEAR_COLOR, rect)
+
+    def _present(self, rects):
+        """Scale the rects of the display (all of it if None) to the
+        window, and return the rects of the window they changed"""
+        if rects is not None and not rects:
+            return rects
+        if (rects is None or self._integer_scale is None or
+            self._display_flags & pygame.DOUBLEBUF):
+            if self._display_flags & pygame.DOUBLEBUF:
+                # The back buffer holds an older frame
+                self._fill_borders()
+            if config.WINDOW_SMOOTH_SCALE and self.display.get_bitsize() in (24, 32):
+                pygame.transform.smoothscale(self.display, self._view_rect.size, self._view)
+            else:
+                pygame.transform.scale(self.display, self._view_rect.size, self._view)
+            return [self._view_rect]
+        scale_x, scale_y = self._integer_scale
+        window_rects = []
+        for rect in rects:
+            view_rect = pygame.Rect((rect.left*scale_x, rect.top*scale_y),
+                                    (rect.width*scale_x, rect.height*scale_y))
+            pygame.transform.scale(self.display.subsurface(rect), view_rect.size,
+                                   self._view.subsurface(view_rect))
+            window_rects.append(view_rect.move(self._view_rect.topleft))
+        return window_rects
+
+    def _worm_area_view_rect(self):
+        """The part of the worm area inside its bounds rect"""
+        rw = config.BOUNDS_RECT_WIDTH
+        (x, y), (w, h) = config.WORM_AREA_POS, config.WORM_AREA_SIZE
+        return pygame.Rect((x, y), (w - rw, h - rw))
+
+    def _tick_fraction(self):
+        """The fraction of the tick interval passed since the last tick
+        of the worms, see Worm.drawn_position"""
+        return 0.0
+
+    def _draw_worm_area(self):
+        if self._governor.allows('fog fade'):
+            self.worm_area.set_fog_fade_levels(config.FOG_FADE_LEVELS)
+        else:
+            self.worm_area.set_fog_fade_levels(config.GOVERNOR_FOG_FADE_LEVELS)
+        area_rect = pygame.Rect(config.WORM_AREA_POS, config.WORM_AREA_SIZE)
+        rects = [rect.move(area_rect.topleft)
+                 for rect in self.worm_area.draw(self._tick_fraction())]
+        if self._dirty_rects.is_all():
+            rects = [area_rect]
+        else:
+            # The bounds rect covers the rest
+            view_rect = self._worm_area_view_rect()
+            rects = [view_rect.clip(rect) for rect in rects]
+        for rect in rects:
+            if not rect:
+                continue
+            self.display.blit(self.worm_area_surface, rect.topleft,
+                              rect.move(-area_rect.left, -area_rect.top))
+            self._dirty_rects.add(rect)
+
+    def _draw_hud(self):
+        """Draw what changed in the Hud (or all of it on full redraws),
+        and return the rects it drew"""
+        rects = None if self._dirty_rects.is_all() else []
+        refresh = (self._governor.allows('hud refresh') or
+                   self._frame_count % config.GOVERNOR_HUD_INTERVAL == 0)
+        rects = [rect.move(config.HUD_AREA_POS)
+                 for rect in self.hud.draw(self.hud_area, rects, refresh)]
+        self._dirty_rects.add_list(rects)
+        return rects
+
+    def _overlay_layers(self):
+        """The (name, key, rect, surface_func) of the layers above the
+        display, bottom first, see Overlays"""
+        layers = []
+        if self._instructions_lines is not None:
+            lines = self._instructions_lines()
+            layers.append(('instructions', lines, self._worm_area_view_rect(),
+                           lambda: instructions.create_surface(lines)))
+        if self._texts:
+            texts = tuple(self._texts)
+            layers.append(('texts', texts, self._texts_rect(),
+                           lambda: self._texts_surface(texts)))
+        for name, menu in self.menus.iteritems():
+            if menu.is_enabled():
+                layers.append((('menu', name), menu.phase(),
+                               pygame.Rect(config.MENU_AREA_POS, config.MENU_AREA_SIZE),
+                               menu.render))
+        if self.credits is not None:
+            layers.extend(self.credits.overlays())
+        return layers
+
+    def _restore_below_overlays(self, rect):
+        """Redraw everything below the overlays in the rect"""
+        self.display.set_clip(rect)
+        self.display.fill(config.CLEAR_COLOR)
+        self.display.blit(self.worm_area_surface, config.WORM_AREA_POS)
+        hud_rect = pygame.Rect(config.HUD_AREA_POS, config.HUD_AREA_SIZE)
+        if hud_rect.colliderect(rect):
+            # As rendered (or not) by _draw_hud
+            self.hud.draw(self.hud_area, [hud_rect.clip(rect).move(-hud_rect.left, -hud_rect.top)],
+                          refresh=False)
+        # The Hud surface ignores the clip
+        self.display.set_clip(rect)
+        self._draw_bounds_rect()
+        self._blit_text()
+        self._blit_fps()
+        self.display.set_clip(None)
+
+    def _blit_fps(self):
+        self.display.fill(config.CLEAR_COLOR, (config.FPS_POS, config.FPS_SIZE))
+        fpsx, fpsy = config.FPS_POS
+        width, height = config.FPS_SIZE
+        x = fpsx + width - self._fps_surface.get_width()
+        self.display.blit(self._fps_surface, (x, fpsy))
+
+    def _draw_fps(self):
+        if self._last_fps_text is None or self._governor.allows('fps text'):
+            text = '%.2f' % (self._scheduler.get_fps(),)
+        else:
+            text = self._last_fps_text
+        rect = pygame.Rect(config.FPS_POS, config.FPS_SIZE)
+        # The Hud may have been drawn over it
+        if text == self._last_fps_text and not self._dirty_rects.intersects(rect):
+            return
+        self._last_fps_text = text
+        self._fps_surface = glyphs.render(self._font, text, True, config.FPS_COLOR)
+        self._blit_fps()
+        self._dirty_rects.add(rect)
+
+    def _expire_texts(self):
+        for index, (text_time, text) in enumerate(self._texts):
+            if text_time + config.TEXTS_EXPIRATION_TIME > time.time():
+                # text has not expired yet
+                break
+            # keep going while texts are expired
+        else:
+            index = len(self._texts)
+        # Get rid of all the expired texts
+        self._texts = self._texts[index:]
+
+    def _texts_rect(self):
+        x, y = config.TEXTS_LEFT_BOTTOM
+        x += config.WORM_AREA_POS[0]
+        y += config.WORM_AREA_POS[1]
+        # Now x, y are the display-relative position of the bottom of the texts area
+
+        height = font_height(self._texts_font)*len(self._texts)
+        return pygame.Rect((x, y - height), (config.DISPLAY_MODE[0] - x, height))
+
+    def _texts_surface(self, texts):
+        surface = pygame.Surface(self._texts_rect().size, pygame.SRCALPHA, 32)
+        y = 0
+        text_height = font_height(self._texts_font)
+        for text_time, text in texts:
+            text_surface = glyphs.render(self._texts_font, text, True, config.TEXTS_COLOR)
+            surface.blit(text_surface, (0, y))
+            y += text_height
+        return surface
+
+    def _blit_text(self):
+        text_area_rect = pygame.Rect(config.TEXT_AREA_POS, config.TEXT_AREA_SIZE)
+        self.display.fill(config.CLEAR_COLOR, text_area_rect)
+        self.display.blit(self._current_text_surface, config.TEXT_AREA_POS)
+
+    def _draw_text(self):
+        text_area_rect = pygame.Rect(config.TEXT_AREA_POS, config.TEXT_AREA_SIZE)
+        if (self._current_text_surface is not self._last_text_surface or
+            self._dirty_rects.intersects(text_area_rect)):
+            self._last_text_surface = self._current_text_surface
+            self._blit_text()
+            self._dirty_rects.add(text_area_rect)
+
+    def _draw_bounds_rect(self):
+        (x, y), (w, h) = config.WORM_AREA_POS, config.WORM_AREA_SIZE
+        rw = config.BOUNDS_RECT_WIDTH
+        rect = ((x - rw, y - rw),
+                (w + rw, h + rw))
+        pygame.draw.rect(self.display, config.BOUNDS_RECT_COLOR, rect, config.BOUNDS_RECT_WIDTH)
@@ -0,0 +1,93 @@
+import pygame
+from collections import deque
+from configfile import config
+from stamps import stamp_all
+from util import display_format
+
+class TrailChunks(object):
+    """The painted trails of the arena, in chunk surfaces.
+
+    Only the max_chunks most recently used chunks are kept.  Others
+    are painted by paint_func(surface, rect) when needed again, from
+    the circles of the canvas in the arena rect, so overlapping trails
+    of different worms may come out in another order than painted.
+    Circles stamped on chunks that are not kept are only painted then.
+    """
+    def __init__(self, arena_size, chunk_size, max_chunks, paint_func):
+        self.arena_rect = pygame.Rect((0, 0), arena_size)
+        self.chunk_width, self.chunk_height = chunk_size
+        self._max_chunks = max_chunks
+        self._paint_func = paint_func
+        self.clear()
+
+    def clear(self):
+        self._chunks = {}
+        # The chunk keys, least recently used first
+        self._used = deque()
+
+    def _chunk_rect(self, (chunk_x, chunk_y)):
+        return pygame.Rect((chunk_x*self.chunk_width, chunk_y*self.chunk_height),
+                           (self.chunk_width, self.chunk_height)).clip(self.arena_rect)
+
+    def _chunk_keys(self, rect):
+        rect = rect.clip(self.arena_rect)
+        if not rect:
+            return []
+        return [(chunk_x, chunk_y)
+                for chunk_y in xrange(rect.top // self.chunk_height,
+                                      (rect.bottom - 1) // self.chunk_height + 1)
+                for chunk_x in xrange(rect.left // self.chunk_width,
+                                      (rect.right - 1) // self.chunk_width + 1)]
+
+    def _chunk(self, key):
+        chunk = self._chunks.get(key)
+        if chunk is not None:
+            if self._used[-1] != key:
+                self._used.remove(key)
+                self._used.append(key)
+            return chunk
+        if len(self._chunks) >= self._max_chunks:
+            del self._chunks[self._used.popleft()]
+        rect = self._chunk_rect(key)
+        chunk = display_format(pygame.Surface(rect.size, pygame.SWSURFACE))
+        chunk.fill(config.CLEAR_COLOR)
+        self._paint_func(chunk, rect)
+        self._chunks[key] = chunk
+        self._used.append(key)
+        return chunk
+
+    def stamp_all(self, color, positions, diameter):
+        """Stamp disks centered at the positions on the kept chunks and
+        return the rects of the arena they changed"""
+        radius = diameter/2
+        if self._chunk_rect((0, 0)) == self.arena_rect:
+            # A single chunk holds all of the arena
+            return stamp_all(self._chunk((0, 0)), color, positions, diameter)
+        positions_of_key = {}
+        for x, y in positions:
+            rect = pygame.Rect((x - radius, y - radius), (2*radius, 2*radius))
+            for key in self._chunk_keys(rect):
+                positions_of_key.setdefault(key, []).append((x, y))
+        rects = []
+        for key, key_positions in positions_of_key.iteritems():
+            chunk_rect = self._chunk_rect(key)
+            chunk = self._chunks.get(key)
+            if chunk is None:
+                rects.extend([pygame.Rect((x - radius, y - radius),
+                                          (2*radius, 2*radius)).clip(chunk_rect)
+                              for x, y in key_positions])
+                continue
+            left, top = chunk_rect.topleft
+            rects.extend([rect.move(left, top) for rect in
+                          stamp_all(chunk, color, [(x - left, y - top) for x, y in key_positions],
+                                    diameter)])
+        return rects
+
+    def blit_to(self, surface, rect, position):
+        """Blit the rect of the arena to the position on the surface"""
+        x, y = position
+        for key in self._chunk_keys(rect):
+            chunk_rect = self._chunk_rect(key)
+            part = rect.clip(chunk_rect)
+            surface.blit(self._chunk(key), (x + part.left - rect.left, y + part.top - rect.top),
+                         part.move(-chunk_rect.left, -chunk_rect.top))
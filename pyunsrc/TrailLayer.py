@@ -0,0 +1,129 @@
+from pygame import Rect
+from util import sqr_distance_to_segment, capsule_rect
+
+class TrailLayer(object):
+    """The static, old part of the circles of a Canvas.
+
+    For every circle diameter, a byte per area pixel holds the owner
+    index + 1 of the circle centered there (0 for none), so the memory
+    depends on the area size rather than on the number of circles.
+    Circles of the same diameter and center are merged into one.
+
+    Trail circles have no records, their (negative) ids encode their
+    diameter layer and pixel.
+    """
+    def __init__(self, size):
+        self.area_rect = Rect((0,0), size)
+        self.width, self.height = size
+        self._layer_size = self.width*self.height
+        self._diameters = []
+        self._owners_of_layer = []
+        self.reset_stats()
+
+    def reset_stats(self):
+        """Reset the counts of the circles the collision queries went
+        through and of the pixels they scanned, see Canvas"""
+        self.candidate_count = 0
+        self.scanned_area = 0
+
+    def _layer(self, diameter):
+        if diameter not in self._diameters:
+            self._diameters.append(diameter)
+            self._owners_of_layer.append(bytearray(self._layer_size))
+        return self._diameters.index(diameter)
+
+    def add(self, (x, y), diameter, owner):
+        assert 0 <= owner < 255
+        layer = self._layer(diameter)
+        self._owners_of_layer[layer][y*self.width + x] = owner + 1
+
+    def layers(self):
+        """Return the (diameter, owner + 1 of each pixel) of the layers"""
+        return zip(self._diameters, self._owners_of_layer)
+
+    def id_of(self, layer, pixel):
+        """The id of the circle of the layer centered at the pixel (or
+        the ids of a numpy array of pixels)"""
+        return -1 - (layer*self._layer_size + pixel)
+
+    def position(self, circle_id):
+        pixel = (-1 - circle_id) % self._layer_size
+        return pixel % self.width, pixel // self.width
+
+    def diameter(self, circle_id):
+        return self._diameters[(-1 - circle_id) // self._layer_size]
+
+    def owner(self, circle_id):
+        layer, pixel = divmod(-1 - circle_id, self._layer_size)
+        return self._owners_of_layer[layer][pixel] - 1
+
+    def _rect_pixels(self, layer, rect):
+        """Return the (x, y, pixel) of the circle centers in the rect"""
+        rect = rect.clip(self.area_rect)
+        owners = self._owners_of_layer[layer]
+        width = self.width
+        pixels = []
+        for row_y in xrange(rect.top, rect.bottom):
+            start = row_y*width + rect.left
+            end = start + rect.width
+            # Counting does not copy the row, most are empty
+            if owners.count('\0', start, end) < rect.width:
+                for offset, owner in enumerate(owners[start:end]):
+                    if owner:
+                        pixels.append((rect.left + offset, row_y, start + offset))
+        return pixels
+
+    def _query_pixels(self, layer, rect):
+        """_rect_pixels, counted in the stats"""
+        pixels = self._rect_pixels(layer, rect)
+        clipped = rect.clip(self.area_rect)
+        self.scanned_area += clipped.width*clipped.height
+        self.candidate_count += len(pixels)
+        return pixels
+
+    def items(self):
+        return [self.id_of(layer, pixel)
+                for layer in xrange(len(self._diameters))
+                for x, y, pixel in self._rect_pixels(layer, self.area_rect)]
+
+    def in_rect(self, rect):
+        """Return the ids of the circles whose bounding rects overlap
+        the given rect, see Canvas"""
+        ids = []
+        for layer, diameter in enumerate(self._diameters):
+            half = diameter/2
+            # The centers of those rects
+            centers_rect = Rect((rect.left - diameter + half + 1, rect.top - diameter + half + 1),
+                                (rect.width + diameter - 1, rect.height + diameter - 1))
+            ids.extend([self.id_of(layer, pixel)
+                        for x, y, pixel in self._rect_pixels(layer, centers_rect)])
+        return ids
+
+    def collisions(self, position, diameter):
+        """Return the ids of the circles colliding with the given
+        circle, see Canvas"""
+        x, y = position
+        left = x - diameter/2
+        top = y - diameter/2
+        ids = []
+        for layer, other_diameter in enumerate(self._diameters):
+            half = other_diameter/2
+            sqr_reach = ((diameter + other_diameter) / 2)**2
+            rect = capsule_rect(position, position, (diameter + other_diameter)/2.0)
+            for other_x, other_y, pixel in self._query_pixels(layer, rect):
+                other_left = other_x - half
+                other_top = other_y - half
+                if (left < other_left + other_diameter and other_left < left + diameter and
+                    top < other_top + other_diameter and other_top < top + diameter and
+                    (x-other_x)**2 + (y-other_y)**2 <= sqr_reach):
+                    ids.append(self.id_of(layer, pixel))
+        return ids
+
+    def capsule_collisions(self, start, end, diameter):
+        ids = []
+        for layer, other_diameter in enumerate(self._diameters):
+            reach = (diameter + other_diameter)/2.0
+            for x, y, pixel in self._query_pixels(layer, capsule_rect(start, end, reach)):
+                if sqr_distance_to_segment((x, y), start, end) <= reach**2:
+                    ids.append(self.id_of(layer, pixel))
+        return ids
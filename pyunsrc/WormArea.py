@@ -1,54 +1,234 @@
 import pygame
 from configfile import config
+from log import warning
 from Canvas import Canvas
+from BitmapCanvas import BitmapCanvas
+from Fog import Fog
+from Camera import Camera
+from TrailChunks import TrailChunks
+from stamps import stamp_all
+try:
+    from NumpyCanvas import NumpyCanvas
+    from NumpyFog import NumpyFog
+except ImportError:
+    NumpyCanvas = NumpyFog = None
 
 # TODO: Use State pattern, yuck!
 
 class WormArea(object):
     def __init__(self, game, surface):
+        """The surface shows the view of the arena (see Camera)"""
         self.game = game
         self.surface = surface
-        slot_length = self.game.net_config.DIAMETER*4
-        self.canvas = Canvas(config.WORM_AREA_SIZE, (slot_length, slot_length))
+        self.arena_size = config.ARENA_SIZE or surface.get_size()
+        self._camera = Camera(self.arena_size, surface.get_size(), config.CAMERA_MODE)
+        # The trails of the worms, without the overlays (hole circles
+        # and eyes) that are drawn above them on the surface.  An arena
+        # the view holds is a single chunk.
+        view_width, view_height = surface.get_size()
+        arena_width, arena_height = self.arena_size
+        large_arena = arena_width > view_width or arena_height > view_height
+        if large_arena:
+            chunk_size = config.TRAIL_CHUNK_SIZE
+        else:
+            chunk_size = self.arena_size
+        chunk_width, chunk_height = chunk_size
+        view_chunks = ((-(-view_width // chunk_width) + 1) *
+                       (-(-view_height // chunk_height) + 1))
+        self._trail = TrailChunks(self.arena_size, chunk_size,
+                                  view_chunks * config.TRAIL_CHUNKS_PER_VIEW,
+                                  self._paint_trail)
+        # The color of each worm (owner) index.  The index of a removed
+        # worm is reused once none of its circles are left, as the
+        # TrailLayer holds a byte per owner.
+        self._owner_colors = []
+        self._free_owners = []
+        self._released_owners = []
+        # The number of rounds cleared
+        self.clears = 0
+        # NumpyFog goes over all of the circles, Fog only over those
+        # near the viewers
+        if large_arena or NumpyFog is None:
+            self._fog = Fog(self)
+        else:
+            self._fog = NumpyFog(self)
         self.clear()
-        self.differential_draw_allowed = False
+
+    def _canvas_class(self):
+        engine = config.CANVAS_ENGINE
+        width, height = self.arena_size
+        if engine == 'auto':
+            if (self.game.net_config.DIAMETER <= config.BITMAP_CANVAS_MAX_DIAMETER and
+                width*height <= config.BITMAP_CANVAS_MAX_AREA):
+                engine = 'bitmap'
+            else:
+                engine = 'grid'
+        if engine == 'numpy':
+            if NumpyCanvas is not None:
+                return NumpyCanvas
+            warning("numpy is not available, using the grid canvas")
+            return Canvas
+        engines = dict(grid=Canvas, bitmap=BitmapCanvas)
+        assert engine in engines, "Unknown canvas engine %r" % (engine,)
+        return engines[engine]
 
     def clear(self):
-        self.canvas.clear()
+        # The canvas engine and its slots depend on the diameter, so
+        # they are chosen anew at the start of every round. The same
+        # canvas is kept otherwise, with the slot size the queries of
+        # the last round suggest.
+        canvas_class = self._canvas_class()
+        diameter = self.game.net_config.DIAMETER
+        if (getattr(self, 'canvas', None).__class__ is canvas_class and
+            self._canvas_diameter == diameter):
+            self.canvas.adapt()
+            self.canvas.clear()
+        else:
+            slot_length = diameter*canvas_class.slot_diameters
+            self.canvas = canvas_class(self.arena_size, (slot_length, slot_length))
+            self._canvas_diameter = diameter
+        self._trail.clear()
+        self._free_owners.extend(self._released_owners)
+        self._released_owners = []
+        self.clears += 1
         self.surface.fill(config.CLEAR_COLOR)
+        self._overlay_rects = []
+        self.differential_draw_allowed = False
+
+    def diameter_changed(self):
+        # Circles already on the canvas keep their diameter, only the
+        # slots are resized to suit the new one
+        diameter = self.game.net_config.DIAMETER
+        if not self.canvas.adapt(diameter):
+            slot_length = diameter*self.canvas.slot_diameters
+            self.canvas.reindex((slot_length, slot_length))
+        self._canvas_diameter = diameter
+
+    def add_owner(self, color):
+        if self._free_owners:
+            # The lowest, the same on all peers
+            self._free_owners.sort()
+            owner = self._free_owners.pop(0)
+            self._owner_colors[owner] = color
+            return owner
+        self._owner_colors.append(color)
+        return len(self._owner_colors) - 1
+
+    def release_owner(self, owner, has_circles=True):
+        """Let the owner index be reused, once it has no circles on
+        the canvas"""
+        if has_circles:
+            self._released_owners.append(owner)
+        else:
+            self._free_owners.append(owner)
+
+    def set_owner_colors(self, colors):
+        self._owner_colors = list(colors)
+
+    def owner_color(self, owner):
+        return self._owner_colors[owner]
 
-    def draw_circle(self, color, position, diameter):
-        x, y = position
-        pygame.draw.circle(self.surface, color, map(int, position), diameter/2)
+    def owner_colors(self):
+        return tuple(self._owner_colors)
 
-    def undraw_circle(self, position, diameter):
-        self.draw_circle(config.CLEAR_COLOR, position, diameter)
+    def _paint_trail(self, surface, rect):
+        """Paint the circles of the canvas in the arena rect on the
+        surface"""
+        canvas = self.canvas
+        positions_of_key = {}
+        for circle_id in canvas.in_rect(rect):
+            x, y = canvas.position(circle_id)
+            key = canvas.owner(circle_id), canvas.diameter(circle_id)
+            positions_of_key.setdefault(key, []).append((x - rect.left, y - rect.top))
+        for (owner, diameter), positions in sorted(positions_of_key.iteritems()):
+            stamp_all(surface, self.owner_color(owner), positions, diameter)
 
-    def show_circle(self, sqr_distance, circle):
-        if circle in self.min_circles_sqr_distance:
-            if sqr_distance >= self.min_circles_sqr_distance[circle]:
-                return
-        self.min_circles_sqr_distance[circle] = sqr_distance
+    def _camera_target(self, tick_fraction):
+        """The position of the local player the camera follows, or None"""
+        local_players = [player for player in self.game.all_players()
+                         if self.game.is_local_player(player)]
+        if not local_players:
+            return None
+        controller = getattr(self.game, 'controller', None)
+        if controller is not None and controller.chosen_player() in local_players:
+            return controller.chosen_player().worm.drawn_position(tick_fraction)
+        living_players = [player for player in local_players if player.alive]
+        return (living_players or local_players)[0].worm.drawn_position(tick_fraction)
+
+    def _show_trail(self, rect):
+        """Show the arena rect of the trail on the surface, and return
+        the rect of the surface it changed, or None if not seen"""
+        camera = self._camera
+        rect = rect.clip(camera.rect)
+        if not rect:
+            return None
+        if camera.scale == 1:
+            view_rect = pygame.Rect(camera.to_view(rect.topleft), rect.size)
+            self._trail.blit_to(self.surface, rect, view_rect.topleft)
+            return view_rect
+        # The whole view pixels the rect is scaled into
+        view_rect = camera.rect_to_view(rect)
+        arena_rect = camera.rect_to_arena(view_rect)
+        unscaled = pygame.Surface(arena_rect.size, 0, self.surface)
+        unscaled.fill(config.CLEAR_COLOR)
+        self._trail.blit_to(unscaled, arena_rect.clip(camera.arena_rect), (0, 0))
+        if unscaled.get_bitsize() in (24, 32):
+            scaled = pygame.transform.smoothscale(unscaled, view_rect.size)
+        else:
+            scaled = pygame.transform.scale(unscaled, view_rect.size)
+        return self.surface.blit(scaled, view_rect.topleft)
+
+    def _draw_overlays(self, tick_fraction):
+        self._overlay_rects = []
+        for player in self.game.all_players():
+            self._overlay_rects.extend(player.worm.draw_overlays(self.surface, self._camera,
+                                                                 tick_fraction))
+        return self._overlay_rects
+
+    def set_fog_fade_levels(self, levels):
+        self._fog.fade_levels = levels
+
+    def _draw_fog(self, tick_fraction):
+        self.surface.fill(config.CLEAR_COLOR)
+        self._draw_overlays(tick_fraction)
+        # Only what the local worms see is shown
+        viewer_positions = [player.worm.drawn_position(tick_fraction)
+                            for player in self.game.all_players()
+                            if self.game.is_local_player(player)]
+        self._fog.draw(self.surface, viewer_positions,
+                       self.game.net_config.FOG_VISION_DIAMETER, self._camera)
+
+    def discard_drawing(self):
+        """Forget what the worms have to draw, when nothing is drawn"""
+        for player in self.game.all_players():
+            player.worm.discard_drawing()
+
+    def draw(self, tick_fraction=0.0):
+        """Draw the changes to the surface and return the rects of it
+        that changed.  The worms are drawn ahead of the last tick by the
+        fraction of the tick interval passed since it (see
+        Worm.drawn_position)."""
+        # The trail is kept up to date even when it is not shown
+        trail_rects = []
+        for player in self.game.all_players():
+            trail_rects.extend(player.worm.draw_trail(self._trail))
+        target = self._camera_target(tick_fraction)
+        if target is not None and self._camera.follow(target):
+            self.differential_draw_allowed = False
 
-    def draw(self):
         if self.game.net_config.FOG_ENABLED:
-            self.min_circles_sqr_distance = {}
-            self.surface.fill(config.CLEAR_COLOR)
-            for player in self.game.all_players():
-                player.worm.show()
-            sqr_fog_radius = (self.game.net_config.FOG_VISION_DIAMETER/2)**2
-            for circle, sqr_distance in self.min_circles_sqr_distance.iteritems():
-                relative_distance = min(1.0, (1.0*sqr_distance/sqr_fog_radius))
-                fade_color = [c*(1.0-relative_distance)
-                              for c in circle.worm().color]
-                self.draw_circle(fade_color, circle.position, circle.diameter)
-            del self.min_circles_sqr_distance
+            self._draw_fog(tick_fraction)
             self.differential_draw_allowed = False
-        else:
-            if self.differential_draw_allowed:
-                for player in self.game.all_players():
-                    player.worm.draw_differentially()
-            else:
-                for player in self.game.all_players():
-                    player.worm.draw_full()
-                self.differential_draw_allowed = True
+            return [self.surface.get_rect()]
+        if not self.differential_draw_allowed:
+            self.surface.fill(config.CLEAR_COLOR)
+            self._show_trail(self._camera.rect)
+            self._draw_overlays(tick_fraction)
+            self.differential_draw_allowed = True
+            return [self.surface.get_rect()]
+        # The old overlays are restored from the trail, along with
+        # the new trail circles
+        rects = [self._show_trail(self._camera.rect_to_arena(rect))
+                 for rect in self._overlay_rects]
+        rects.extend([self._show_trail(rect) for rect in trail_rects])
+        return [rect for rect in rects if rect] + self._draw_overlays(tick_fraction)
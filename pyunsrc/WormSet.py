@@ -0,0 +1,317 @@
+import math
+from array import array
+from collections import deque
+from util import angle_towards
+from configfile import config
+import fixedpoint
+from Worm import Worm, Collision
+import PlayerController
+
+# Added to the diameter of the capsule swept by a whole movement, to
+# cover the truncation of the separate steps' positions to pixels
+CAPSULE_DIAMETER_SLACK = 4
+
+class WormSet(object):
+    """The kinematic and paint/hole state of all the worms, in parallel
+    arrays indexed by the worm index.  The index of a removed worm is
+    reused by the next worm added, so the arrays only hold as many
+    worms as are in the game at once.
+
+    The worms still move one after the other, as each worm must see
+    the circles painted by the worms that moved before it, and they
+    share their random generators.  But a whole iteration of all of
+    them is a single call, with every step of a worm in one loop.
+    """
+    def __init__(self, worm_area_size, net_config, worm_area):
+        self.worm_area_size = width, height = worm_area_size
+        self.center = width/2, height/2
+        self.net_config = net_config
+        self._worm_area = worm_area
+        self._xs = array('d')
+        self._ys = array('d')
+        # Radians, or fixedpoint angle units in the fixed point mode,
+        # whose positions are multiples of 1/fixedpoint.ONE
+        self._fixed = False
+        # The (max single movement, fixed point speed) and the
+        # fixedpoint.steps of them at each angle unit moved at, as the
+        # speed only changes every SPEED_INCREASE_INTERVAL
+        self._steps_key = None
+        self._steps_of_units = {}
+        self._angles = array('d')
+        # The distance left to the next phase switch, and whether the
+        # phase is paint (or hole)
+        self._counters = array('d')
+        self._painting = array('b')
+        # The sequence number of the next circle to paint, and of the
+        # oldest one we kept touching since painting it
+        self._seqs = array('i')
+        self._fresh_seqs = array('i')
+        self._owners = array('i')
+        self._randoms = []
+        # The ids of the circles painted that were not baked yet
+        self._recent_ids = []
+        self._worms = []
+        self._free_indexes = []
+
+    def add(self, random, color):
+        """Add a worm and return its view"""
+        owner = self._worm_area.add_owner(color)
+        if self._free_indexes:
+            # The lowest, the same on all peers
+            self._free_indexes.sort()
+            index = self._free_indexes.pop(0)
+            for values in (self._xs, self._ys, self._angles, self._counters,
+                           self._painting, self._seqs, self._fresh_seqs):
+                values[index] = 0
+            self._owners[index] = owner
+            self._randoms[index] = random
+        else:
+            index = len(self._worms)
+            for values in (self._xs, self._ys, self._angles, self._counters):
+                values.append(0.0)
+            for values in (self._painting, self._seqs, self._fresh_seqs):
+                values.append(0)
+            self._owners.append(owner)
+            self._randoms.append(random)
+            self._recent_ids.append(deque())
+            self._worms.append(None)
+        worm = self._worms[index] = Worm(self, index, self._worm_area, color)
+        return worm
+
+    def remove(self, index):
+        """Remove a worm that will not move again, its index and owner
+        index may be reused by the next worms added"""
+        # Its circles no longer need their ids, as they collide with
+        # every other worm
+        canvas = self._worm_area.canvas
+        recent_ids = self._recent_ids[index]
+        while recent_ids:
+            canvas.bake(recent_ids.popleft())
+        # The seqs count the circles painted since the round started
+        self._worm_area.release_owner(self._owners[index], has_circles=self._seqs[index] > 0)
+        self._randoms[index] = None
+        self._worms[index] = None
+        self._free_indexes.append(index)
+
+    def owner(self, index):
+        return self._owners[index]
+
+    def position(self, index):
+        return self._xs[index], self._ys[index]
+
+    def angle(self, index):
+        """The angle of the worm in radians"""
+        if self._fixed:
+            return fixedpoint.radians(int(self._angles[index]))
+        return self._angles[index]
+
+    def reset(self, index, position):
+        self._use_net_config_kinematics()
+        self._xs[index], self._ys[index] = position
+        if self._fixed:
+            self._angles[index] = fixedpoint.angle_towards(position, self.center)
+        else:
+            self._angles[index] = angle_towards(position, self.center)
+        self._seqs[index] = self._fresh_seqs[index] = 0
+        self._recent_ids[index].clear()
+        self._start_drawing(index)
+
+    def _start_drawing(self, index):
+        self._counters[index] = self._randoms[index]().randrange(
+            self.net_config.MIN_DRAW_SIZE, self.net_config.MAX_DRAW_SIZE)
+        self._painting[index] = True
+
+    def _start_hole(self, index):
+        self._counters[index] = self._randoms[index]().randrange(
+            self.net_config.MIN_HOLE_SIZE, self.net_config.MAX_HOLE_SIZE)
+        self._painting[index] = False
+
+    def _bake_old_circles(self, index):
+        # Circles older than the oldest one the worm may touch only
+        # ever collide, so they no longer need their ids and sequence
+        # numbers
+        canvas = self._worm_area.canvas
+        bake_seq = min(self._fresh_seqs[index],
+                       self._seqs[index] - config.CANVAS_BAKE_AGE)
+        recent_ids = self._recent_ids[index]
+        while recent_ids and canvas.seq(recent_ids[0]) < bake_seq:
+            canvas.bake(recent_ids.popleft())
+
+    def _use_net_config_kinematics(self):
+        """Convert the angles and positions if the kinematics mode was
+        changed"""
+        fixed = bool(self.net_config.FIXED_POINT_KINEMATICS)
+        if fixed == self._fixed:
+            return
+        self._fixed = fixed
+        angles = self._angles
+        for index in xrange(len(angles)):
+            if fixed:
+                angles[index] = fixedpoint.units_of_radians(angles[index])
+                self._xs[index] = fixedpoint.from_fixed(fixedpoint.to_fixed(self._xs[index]))
+                self._ys[index] = fixedpoint.from_fixed(fixedpoint.to_fixed(self._ys[index]))
+            else:
+                angles[index] = fixedpoint.radians(int(angles[index]))
+
+    def steer(self, indexes, keys_states):
+        """Turn the given worms by their PlayerController keys states"""
+        self._use_net_config_kinematics()
+        degrees = (float(self.net_config.ANGLES_PER_SECOND) /
+                   self.net_config.GAME_ITERATIONS_PER_SECOND)
+        if self._fixed:
+            angle_diff = fixedpoint.units_of_degrees(degrees)
+        else:
+            angle_diff = math.radians(degrees)
+        angles = self._angles
+        if self._fixed:
+            # The units are whole, and wrapped only when they change
+            units = fixedpoint.ANGLE_UNITS
+            for index, keys_state in zip(indexes, keys_states):
+                if keys_state & PlayerController.LEFT:
+                    angles[index] = (angles[index] - angle_diff) % units
+                elif keys_state & PlayerController.RIGHT:
+                    angles[index] = (angles[index] + angle_diff) % units
+            return
+        for index, keys_state in zip(indexes, keys_states):
+            if keys_state & PlayerController.LEFT:
+                angles[index] -= angle_diff
+            elif keys_state & PlayerController.RIGHT:
+                angles[index] += angle_diff
+
+    def _float_steps(self, index, speed, max_single_movement):
+        angle = self._angles[index]
+        cos_angle = math.cos(angle)
+        sin_angle = math.sin(angle)
+        x = self._xs[index]
+        y = self._ys[index]
+        movements = []
+        while speed > max_single_movement:
+            movements.append(max_single_movement)
+            speed -= max_single_movement
+        movements.append(speed)
+        steps = []
+        for movement in movements:
+            x += movement * cos_angle
+            y += movement * sin_angle
+            steps.append((movement, x, y))
+        return steps
+
+    def _steps_of_worms(self, indexes, speed):
+        """Return the (movement, x, y) of each step of moving each of
+        the worms forward by speed"""
+        max_single_movement = min(3, self.net_config.DIAMETER//3)
+        if not self._fixed:
+            return [self._float_steps(index, speed, max_single_movement) for index in indexes]
+        # Multiplying by a power of 2 is exact, so every peer truncates
+        # the speed alike, and the positions are multiples of 1/ONE that
+        # the offsets are added to exactly
+        key = max_single_movement, int(speed * fixedpoint.ONE)
+        if key != self._steps_key:
+            self._steps_key = key
+            self._steps_of_units = {}
+        steps_of_units = self._steps_of_units
+        xs = self._xs
+        ys = self._ys
+        angles = self._angles
+        steps_of_worms = []
+        for index in indexes:
+            units = int(angles[index])
+            unit_steps = steps_of_units.get(units)
+            if unit_steps is None:
+                unit_steps = steps_of_units[units] = fixedpoint.steps(units, *key)
+            steps_of_worms.append([(movement, xs[index] + x_offset, ys[index] + y_offset)
+                                   for movement, x_offset, y_offset in unit_steps])
+        return steps_of_worms
+
+    def forward(self, indexes, speed):
+        """Move the given worms forward by speed, in order, and return
+        the indexes of those that collided, in the order they did."""
+        self._use_net_config_kinematics()
+        canvas = self._worm_area.canvas
+        # Baking frees ids, so it must not happen while a batch is used
+        for index in indexes:
+            self._bake_old_circles(index)
+        diameter = self.net_config.DIAMETER
+        steps_of_worms = self._steps_of_worms(indexes, speed)
+        capsules = []
+        for index, steps in zip(indexes, steps_of_worms):
+            movement, end_x, end_y = steps[-1]
+            capsules.append(((self._xs[index], self._ys[index]), (end_x, end_y),
+                             diameter + CAPSULE_DIAMETER_SLACK))
+        if canvas.batch_queries:
+            batch = canvas.batch_capsule_collisions(capsules)
+        else:
+            batch = [None] * len(capsules)
+
+        collided = []
+        for index, steps, capsule, capsule_collisions in zip(indexes, steps_of_worms,
+                                                             capsules, batch):
+            (start_x, start_y), end, capsule_diameter = capsule
+            if not canvas.capsule_queries:
+                capsule_collisions = None
+            elif capsule_collisions is None:
+                capsule_collisions = canvas.capsule_collisions(*capsule)
+            else:
+                # Add what the worms that moved since the query painted
+                capsule_collisions += canvas.added_capsule_collisions(*capsule)
+            worm = self._worms[index]
+            try:
+                self._forward(index, steps, capsule_collisions)
+            except Collision:
+                collided.append(index)
+                worm.motion = (0, 0)
+            else:
+                worm.motion = self._xs[index] - start_x, self._ys[index] - start_y
+                worm.post_forward()
+        return collided
+
+    def _forward(self, index, steps, capsule_collisions):
+        canvas = self._worm_area.canvas
+        worm = self._worms[index]
+        circles_to_draw = worm.circles_to_draw
+        recent_ids = self._recent_ids[index]
+        owner = self._owners[index]
+        diameter = self.net_config.DIAMETER
+        radius = diameter/2
+        width, height = self.worm_area_size
+
+        try:
+            for movement, x, y in steps:
+                if x < radius or y < radius or x > width-radius or y > height-radius:
+                    raise Collision()
+                position = int(x), int(y)
+
+                # Switching the phase takes effect from the next step
+                counter = self._counters[index]
+                if self._painting[index]:
+                    if counter <= 0:
+                        self._start_hole(index)
+                    self._counters[index] -= movement
+                    circles_to_draw.append(position)
+                    circle_id = canvas.add(position, diameter, owner, self._seqs[index])
+                    self._seqs[index] += 1
+                    if capsule_collisions is not None:
+                        capsule_collisions.append(circle_id)
+                    recent_ids.append(circle_id)
+                    worm.hole_circle = None
+                else:
+                    if counter <= 0:
+                        self._start_drawing(index)
+                    self._counters[index] -= movement
+                    worm.hole_circle = position
+
+                # The following allows detection of collisions only
+                # with things we stopped colliding with and
+                # re-collided with: the only circles we may touch are
+                # our own, from the oldest one we kept touching since
+                # painting it on
+                fresh_seq = canvas.own_collision_seq(position, diameter, owner,
+                                                     self._seqs[index],
+                                                     self._fresh_seqs[index],
+                                                     capsule_collisions)
+                if fresh_seq is None:
+                    raise Collision()
+                self._fresh_seqs[index] = fresh_seq
+        finally:
+            self._xs[index] = x
+            self._ys[index] = y
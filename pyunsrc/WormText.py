@@ -1,7 +1,7 @@
-import pygame
 import math
 from configfile import config
 from util import forwarded_pos
+from stamps import stamp_all
 from BoundFunc import BoundFunc
 from worm_letter_plans import worm_letter_plans
 
@@ -23,12 +23,13 @@ class WormPainter(object):
         self.position = x, y
     def forward(self, surface):
         count = self.speed
+        positions = []
         while count > 0:
             MAX_SINGLE_MOVEMENT = 3
             self.position = forwarded_pos(self.position, self.angle, min(count, MAX_SINGLE_MOVEMENT))
             count -= MAX_SINGLE_MOVEMENT
-            pygame.draw.circle(surface, self.color, map(int, self.position),
-                               int(self.diameter/2))
+            positions.append(tuple(map(int, self.position)))
+        stamp_all(surface, self.color, positions, int(self.diameter))
     def done(self, surface):
         return True
     def plan_nothing(self, surface):
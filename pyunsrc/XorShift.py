@@ -0,0 +1,48 @@
+MASK = 0xFFFFFFFF
+
+def mix(value):
+    """Scramble the bits of a 32-bit value (the murmur3 finalizer)"""
+    value &= MASK
+    value ^= value >> 16
+    value = (value * 0x85EBCA6B) & MASK
+    value ^= value >> 13
+    value = (value * 0xC2B2AE35) & MASK
+    value ^= value >> 16
+    return value
+
+class XorShift(object):
+    """Marsaglia's 32-bit xorshift generator.
+
+    Only integer operations masked to 32 bits are used, so the numbers
+    are the same on every platform and Python version.  The whole state
+    is one int (see getstate/setstate).
+    """
+    def __init__(self, seed):
+        self.setstate(mix(seed) or 1)
+
+    def getstate(self):
+        return self._state
+
+    def setstate(self, state):
+        assert 0 < state <= MASK, "Invalid xorshift state"
+        self._state = state
+
+    def next(self):
+        """Return the next 32-bit number"""
+        x = self._state
+        x ^= (x << 13) & MASK
+        x ^= x >> 17
+        x ^= (x << 5) & MASK
+        self._state = x
+        return x
+
+    def randrange(self, start, stop=None):
+        if stop is None:
+            start, stop = 0, start
+        width = stop - start
+        assert 0 < width <= MASK + 1, "Invalid range for randrange"
+        return start + int(self.next() * width >> 32)
+
+    def split(self):
+        """Return a new generator for a separate stream of numbers"""
+        return XorShift(self.next() ^ 0x9E3779B9)
@@ -17,10 +17,10 @@ def save(modulename, config):
 
 def load(modulename):
     filename = modulename + '.py'
+    config = __import__('pyunsrc.default%s' % (modulename,), {}, {}, ['']).config.copy()
     if os.path.isfile(filename):
-        config = exec_python_file(filename)['config']
-    else:
-        config = __import__('pyunsrc.default%s' % (modulename,), {}, {}, ['']).config
+        # Options missing from older saved files keep their defaults
+        config.update(exec_python_file(filename)['config'])
     return config
 
 config_modulename = 'config'
@@ -15,12 +15,67 @@ config = dict(
     ALLOW_SAME_KEYS = False,
 
     # Note the display must be large enough to contain the worm area size!
+    # All of the layout is in the pixels of the display, which is
+    # shown in a window of WINDOW_SIZE (None for the same size), scaled
+    # keeping its aspect ratio.  Drawing is at the display size
+    # whatever the window size, only the presentation is scaled,
+    # smoothly if WINDOW_SMOOTH_SCALE (slower), and rect by rect if the
+    # scale is an integer.  The size in fullscreen is FULLSCREEN_SIZE,
+    # (0, 0) for the desktop's, or None for the window size.
     DISPLAY_MODE = (800, 600),
+    WINDOW_SIZE = None,
+    FULLSCREEN_SIZE = None,
+    WINDOW_SMOOTH_SCALE = False,
+    # Page flip a double buffered, hardware display rather than update
+    # the changed rects of it.  All of the display is drawn on every
+    # frame then, as the back buffer holds an older frame.
+    DISPLAY_DOUBLE_BUFFER = False,
+    # Draw the game in a separate process, which owns the window, so
+    # that the simulation and the network are not delayed by drawing
+    # on multi-core machines (see RenderProcess).  It is given the new
+    # trail circles in a ring of RENDER_PROCESS_CIRCLES, and snapshots
+    # of the rest of at most RENDER_PROCESS_SNAPSHOT_SIZE bytes.
+    RENDER_PROCESS = False,
+    RENDER_PROCESS_CIRCLES = 1 << 16,
+    RENDER_PROCESS_SNAPSHOT_SIZE = 1 << 16,
     WORM_AREA_POS = (1, 1),
     WORM_AREA_SIZE = (600, 563),
+    # The size of the arena the worms move in, which may be larger
+    # than the WORM_AREA_SIZE view of it, or None for the same size.
+    # Like the worm area size, it must be the same for all hosts.
+    ARENA_SIZE = None,
+    # How a larger arena is shown: 'follow' shows the part around the
+    # chosen (or first) local player, recentering when it gets within
+    # CAMERA_MARGIN of the view's edges, and 'fit' shows all of it,
+    # scaled down
+    CAMERA_MODE = 'follow',
+    CAMERA_MARGIN = 0.2,
+    # The trails of a larger arena are kept in chunks of this size, at
+    # most this many times as many as a view covers
+    TRAIL_CHUNK_SIZE = (256, 256),
+    TRAIL_CHUNKS_PER_VIEW = 2,
 
     WORM_EYE_DIAMETER = 2,
 
+    # The number of brightness levels of the circles faded by the fog
+    FOG_FADE_LEVELS = 32,
+
+    # The collision detection engine of the worm area: 'grid' is the
+    # pure Python canvas, 'numpy' tests whole canvas slots at once and
+    # pays off in long rounds with dense trails (falls back to 'grid'
+    # if numpy is not installed), 'bitmap' looks worm steps up in a
+    # per-pixel map of the circles. 'auto' picks 'bitmap' at the start
+    # of a round if the worm diameter is at most
+    # BITMAP_CANVAS_MAX_DIAMETER and 'grid' otherwise.
+    CANVAS_ENGINE = 'auto',
+    BITMAP_CANVAS_MAX_DIAMETER = 12,
+    # and the arena has at most this many pixels
+    BITMAP_CANVAS_MAX_AREA = 1024*1024,
+    # Worm circles at least this many circles old (and too old to be
+    # touched by their worm without colliding) are baked into a static
+    # per-pixel trail layer, bounding the canvas memory by the area size
+    CANVAS_BAKE_AGE = 64,
+
     MENU_FONT_SIZES = (28, 18),
     MENU_NETCONFIG_FONT_SIZES = (20, 18),
 
@@ -70,6 +125,34 @@ config = dict(
     TEXT_COLOR = (200, 200, 200),
     KEYS_FONT_SIZE = 22,
 
+    # The simulation runs at the net config's GAME_ITERATIONS_PER_SECOND
+    # and frames are rendered at most this often
+    MAX_FRAMES_PER_SECOND = 60,
+    # Frames rendered between ticks draw the worms' heads, overlays and
+    # the camera ahead of the last tick, by the time passed since it.
+    # Without this, frames are only rendered after a tick and at most
+    # at its rate, which saves the time of the frames between ticks.
+    FRAMES_ABOVE_TICK_RATE = True,
+    # Seconds the simulation may fall behind the wall clock and still
+    # catch up, skipping frames meanwhile
+    MAX_SIMULATION_LAG = 0.25,
+    # Waits for the next tick or frame sleep until this many seconds
+    # before it, and spin the rest
+    SCHEDULER_SPIN_TIME = 0.002,
+
+    # The governor measures the mean time of this many recent frames,
+    # and drops optional work (see Governor) while it is more than
+    # GOVERNOR_BUDGET of a tick interval (less the time of a tick).
+    # The work is done again while it is less than GOVERNOR_RECOVERY
+    # of that budget.
+    GOVERNOR_FRAMES = 25,
+    GOVERNOR_BUDGET = 0.5,
+    GOVERNOR_RECOVERY = 0.5,
+    # The Hud is refreshed only every this many frames and the fog has
+    # this many fade levels when the governor drops them
+    GOVERNOR_HUD_INTERVAL = 10,
+    GOVERNOR_FOG_FADE_LEVELS = 4,
+
     FPS_COLOR = (200, 150, 100),
     FPS_POS = (740, 570),
     FPS_SIZE = (60, 30),
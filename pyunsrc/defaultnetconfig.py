@@ -21,6 +21,10 @@ config = dict(
 
     WORM_SYNC_HOLES = True,
 
+    # Move the worms in integer angle units and fixed point positions,
+    # which come out the same on every platform and Python build
+    FIXED_POINT_KINEMATICS = False,
+
     FOG_ENABLED = False,
     FOG_VISION_DIAMETER = 180,
 )
@@ -0,0 +1,128 @@
+"""Fixed point worm kinematics.
+
+Angles are integer units of a whole circle divided to ANGLE_UNITS, and
+positions and distances are integers of FRACTION_BITS fraction bits.
+The sine table is computed with integer arithmetic only, so all of it
+is the same on every platform and Python build, unlike math.sin and
+friends.
+"""
+
+import math
+
+ANGLE_UNITS = 4096
+FRACTION_BITS = 16
+ONE = 1 << FRACTION_BITS
+
+# The extra precision of the table computation
+_SCALE_BITS = 80
+_SCALE = 1 << _SCALE_BITS
+
+def _arctan_of_inverse(x):
+    """arctan(1/x) * _SCALE"""
+    power = _SCALE // x
+    total = power
+    n = 1
+    sign = -1
+    while power:
+        power //= x*x
+        n += 2
+        total += sign * (power // n)
+        sign = -sign
+    return total
+
+def _sin_table():
+    # Machin's formula
+    pi = 4 * (4*_arctan_of_inverse(5) - _arctan_of_inverse(239))
+    quarter = ANGLE_UNITS // 4
+    quarter_table = []
+    for unit in xrange(quarter + 1):
+        angle = 2 * pi * unit // ANGLE_UNITS
+        # Taylor series
+        term = total = angle
+        n = 1
+        while term:
+            term = -term * angle // _SCALE * angle // _SCALE // ((n+1)*(n+2))
+            total += term
+            n += 2
+        quarter_table.append(int((total * ONE + _SCALE//2) >> _SCALE_BITS))
+    half_table = quarter_table + quarter_table[-2:0:-1]
+    return half_table + [-value for value in half_table]
+
+SIN_TABLE = _sin_table()
+_MASK = ANGLE_UNITS - 1
+_QUARTER = ANGLE_UNITS // 4
+_EIGHTH = ANGLE_UNITS // 8
+# How far around the sign change of the sideways distance angle_towards
+# searches
+_SEARCH_UNITS = 8
+
+def sin(units):
+    return SIN_TABLE[units & _MASK]
+
+def cos(units):
+    return SIN_TABLE[(units + _QUARTER) & _MASK]
+
+def steps(units, max_movement, speed):
+    """Return the (movement, x offset, y offset) of each step of moving
+    at the angle units by the (fixed point) speed in steps of at most
+    the (integer) max_movement.  The offsets are from a position that
+    is a multiple of 1/ONE, and adding them to it is exact"""
+    cos_angle = cos(units)
+    sin_angle = sin(units)
+    x = y = 0
+    result = []
+    while True:
+        movement = min(speed, max_movement * ONE)
+        speed -= movement
+        x += movement * cos_angle >> FRACTION_BITS
+        y += movement * sin_angle >> FRACTION_BITS
+        result.append((from_fixed(movement), from_fixed(x), from_fixed(y)))
+        if not speed:
+            return result
+
+def units_of_degrees(degrees):
+    return int(round(degrees * ANGLE_UNITS / 360.0))
+
+def radians(units):
+    return (units & _MASK) * 2 * math.pi / ANGLE_UNITS
+
+def units_of_radians(radians):
+    return int(round(radians * ANGLE_UNITS / (2 * math.pi))) & _MASK
+
+def to_fixed(value):
+    return int(math.floor(value * ONE))
+
+def from_fixed(value):
+    return value / float(ONE)
+
+def angle_towards((x1, y1), (x2, y2)):
+    """The angle units pointing the most towards (x2, y2)"""
+    dx = x2 - x1
+    dy = y2 - y1
+    if dx == dy == 0:
+        return 0
+    # The eighth of the circle the direction is in, by turning it a
+    # quarter back until it is in the first one
+    quarter_dx, quarter_dy = dx, dy
+    low = 0
+    while not (quarter_dx > 0 and quarter_dy >= 0):
+        quarter_dx, quarter_dy = quarter_dy, -quarter_dx
+        low += _QUARTER
+    if quarter_dy > quarter_dx:
+        low += _EIGHTH
+    # The sideways distance goes from positive to negative across the
+    # eighth, only the table's rounding can make it go back and forth,
+    # within a unit of the direction
+    high = low + _EIGHTH
+    while high - low > 1:
+        middle = (low + high) // 2
+        if cos(middle)*dy - sin(middle)*dx > 0:
+            low = middle
+        else:
+            high = middle
+    # The lowest of equally good ones, as if searching all the units
+    near = sorted([units & _MASK
+                   for units in xrange(low - _SEARCH_UNITS, high + _SEARCH_UNITS + 1)])
+    # The sideways distance is steepest around the best angle
+    return min([units for units in near if cos(units)*dx + sin(units)*dy > 0],
+               key=lambda units: abs(cos(units)*dy - sin(units)*dx))
@@ -0,0 +1,61 @@
+"""Text rendering shared by the game, Hud and menus.
+
+Strings are composed of cached surfaces of their single glyphs, per
+font, antialiasing and color, so new strings of known glyphs cost only
+blits.  The glyphs are placed by their advances, without the kerning
+and sub-pixel positioning of font.render, so a string may come out a
+pixel or so narrower.  The most recently rendered whole strings are
+kept as well.  Fonts should come from font(), so that equal fonts
+share their glyphs.
+"""
+
+import pygame
+from CachedFunc import CachedFunc
+from util import display_format
+
+# The number of most recently rendered strings kept
+STRING_CACHE_SIZE = 64
+
+def font(size, bold=False):
+    return pygame.font.SysFont('', size, bold=bold)
+font = CachedFunc(font)
+
+def _glyph(font, char, antialias, color):
+    """Return the surface of the glyph, with per pixel alpha, and its
+    advance"""
+    rendered = font.render(char, antialias, color)
+    surface = pygame.Surface(rendered.get_size(), pygame.SRCALPHA, 32)
+    surface.blit(rendered, (0, 0))
+    metrics, = font.metrics(char)
+    if metrics is None:
+        return surface, surface.get_width()
+    return surface, metrics[4]
+_glyph = CachedFunc(_glyph)
+
+def _compose(font, text, antialias, color, background):
+    glyphs = [_glyph(font, char, antialias, color) for char in text]
+    width = x = 0
+    height = font.get_height()
+    for glyph, advance in glyphs:
+        width = max(width, x + glyph.get_width())
+        height = max(height, glyph.get_height())
+        x += advance
+    text_surface = pygame.Surface((width, height), pygame.SRCALPHA, 32)
+    x = 0
+    for glyph, advance in glyphs:
+        # Copied rather than blended into the transparent surface
+        text_surface.blit(glyph, (x, 0), None, pygame.BLEND_RGBA_MAX)
+        x += advance
+    if background is None:
+        return display_format(text_surface)
+    surface = pygame.Surface((width, height))
+    surface.fill(background)
+    surface.blit(text_surface, (0, 0))
+    return display_format(surface)
+_render = CachedFunc(_compose, max_size=STRING_CACHE_SIZE)
+
+def render(font, text, antialias, color, background=None):
+    """Like font.render"""
+    if background is not None:
+        background = tuple(background)
+    return _render(font, text, antialias, tuple(color), background)
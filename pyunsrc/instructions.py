@@ -1,11 +1,11 @@
 import pygame
-from util import font_height
+from util import font_height, display_format
 from CachedFunc import CachedFunc
 from configfile import config
 
 def create_surface(lines):
     font = pygame.font.SysFont('', config.INSTRUCTIONS_FONT_SIZE)
-    surface = pygame.Surface(config.WORM_AREA_SIZE, pygame.SWSURFACE)
+    surface = display_format(pygame.Surface(config.WORM_AREA_SIZE, pygame.SWSURFACE))
     surface.set_alpha(config.INSTRUCTIONS_ALPHA * 255)
 
     text_height = font_height(font)
@@ -18,4 +18,5 @@ def create_surface(lines):
         surface.blit(line_surface, (x, y))
         y += text_height
     return surface
-create_surface = CachedFunc(create_surface)
+# The (color, line) lines are built anew on every frame
+create_surface = CachedFunc(create_surface, max_size=16, key=tuple)
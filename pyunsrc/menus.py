@@ -101,6 +101,10 @@ def create_menus(game):
                            option_name = Menu.text('Synchronized holes'),
                            accessor = game._net_config_accessor('WORM_SYNC_HOLES'),
                            keys = []),
+        Menu.BooleanOption(enabled_func = Menu.always,
+                           option_name = Menu.text('Fixed point movement'),
+                           accessor = game._net_config_accessor('FIXED_POINT_KINEMATICS'),
+                           keys = []),
         Menu.NumberOption(enabled_func = Menu.always,
                           option_name = Menu.text('Latency'),
                           accessor = (game.get_latency,
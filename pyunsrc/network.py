@@ -30,6 +30,7 @@ import socketutils
 import socket
 import errno
 import random
+from XorShift import XorShift
 from mymarshal import loads, dumps
 from sets import Set as set
 from Bunch import Bunch
@@ -179,11 +180,11 @@ class Network(object):
         self.timeout_group = set()
 
     def random(self):
-        if self._seed is None:
+        """The random generator of the network, which all the hosts use
+        in sync"""
+        if self._random is None:
             raise RandomError('Network not initialized for random generation yet')
-        x = random.WichmannHill(self._seed)
-        self._seed = x.randrange(0, 1L<<32)
-        return x
+        return self._random
 
     def iteration_actions(self):
         iteration_actions = self._rx_actions
@@ -327,7 +328,7 @@ class Network(object):
         # A very clever random seed injection hack can use this action
         # A very very clever one, so clever it is impractical!
         # (Famous last words :)
-        self._seed = self.iteration_count + sum([host.id for host in self.hosts])
+        self._random = XorShift(self.iteration_count + sum([host.id for host in self.hosts]))
 
     def _connect_to(self, src_host,
                     remote_host_id, remote_host_name,
@@ -348,7 +349,7 @@ class Hoster(Network):
         self._publicized_data = publicized_data
         # Default initial latency
         self.latency = 0
-        self._seed = random.randrange(0, 1L<<32)
+        self._random = XorShift(random.randrange(0, 1L<<32))
     def publicized_data(self):
         return self._publicized_data
     def start_connecting(self):
@@ -373,7 +374,7 @@ class Listener(Hoster):
         # Only after starting to connect
         self.update = None
 
-        self._seed = None
+        self._random = None
 
     def _action__connect_to(self, src_host,
                             remote_host_id, remote_host_name,
@@ -483,7 +484,7 @@ class Connector(Network):
         self.protocol_version = protocol_version
         # Default initial latency
         self.latency = 1
-        self._seed = None
+        self._random = None
     
     def publicized_data(self):
         if not hasattr(self, '_publicized_data'):
@@ -0,0 +1,39 @@
+"""Pre-rendered disks, blitted instead of rasterizing the same circles
+with pygame.draw.circle again and again.
+
+A stamp of a diameter covers exactly the pixels of
+pygame.draw.circle(surface, color, position, diameter/2).
+"""
+
+import pygame
+from CachedFunc import CachedFunc
+from util import display_format
+
+def _disk(color, diameter):
+    radius = diameter/2
+    surface = display_format(pygame.Surface((2*radius, 2*radius), pygame.SWSURFACE))
+    # Differs from the color in every component
+    colorkey = tuple([255-c for c in color])
+    surface.fill(colorkey)
+    pygame.draw.circle(surface, color, (radius, radius), radius)
+    surface.set_colorkey(colorkey, pygame.RLEACCEL)
+    return surface
+_disk = CachedFunc(_disk)
+
+def _color_key(color):
+    # Like pygame, float components are truncated
+    return tuple([int(c) for c in color])
+
+def stamp(surface, color, (x, y), diameter):
+    """Stamp a disk centered at the position and return its rect"""
+    radius = diameter/2
+    return surface.blit(_disk(_color_key(color), diameter),
+                        (int(x) - radius, int(y) - radius))
+
+def stamp_all(surface, color, positions, diameter):
+    """Stamp a disk centered at each of the (integer) positions and
+    return their rects"""
+    disk = _disk(_color_key(color), diameter)
+    radius = diameter/2
+    blit = surface.blit
+    return [blit(disk, (x - radius, y - radius)) for x, y in positions]
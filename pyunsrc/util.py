@@ -1,12 +1,12 @@
 import math
 import pygame
 import socket
-import random
+from XorShift import XorShift
 
 static_modifiers = pygame.KMOD_CAPS | pygame.KMOD_MODE | pygame.KMOD_NUM
 
 def random_of(seed):
-    return random.WichmannHill(seed)
+    return XorShift(seed)
 
 def angle_towards((x1, y1), (x2, y2)):
     if x2-x1 == 0:
@@ -24,6 +24,26 @@ def forwarded_pos((x, y), angle, distance):
     distancey = distance * math.sin(angle)
     return x+distancex, y+distancey
 
+def sqr_distance_to_segment((x, y), (x1, y1), (x2, y2)):
+    dx = x2 - x1
+    dy = y2 - y1
+    sqr_length = dx*dx + dy*dy
+    if sqr_length == 0:
+        part = 0
+    else:
+        part = min(1.0, max(0.0, ((x - x1)*dx + (y - y1)*dy) / float(sqr_length)))
+    nearest_x = x1 + part*dx
+    nearest_y = y1 + part*dy
+    return (x - nearest_x)**2 + (y - nearest_y)**2
+
+def capsule_rect((x1, y1), (x2, y2), reach):
+    """The bounding rect of everything within reach of the segment"""
+    left = int(min(x1, x2) - reach) - 1
+    top = int(min(y1, y2) - reach) - 1
+    right = int(max(x1, x2) + reach) + 2
+    bottom = int(max(y1, y2) + reach) + 2
+    return pygame.Rect((left, top), (right - left, bottom - top))
+
 def accessor(obj, name):
     def get():
         return getattr(obj, name)
@@ -61,3 +81,35 @@ def average(seq):
     if not seq:
         return 0
     return float(sum(seq)) / len(seq)
+
+def display_format(surface):
+    """Return the surface converted to the pixel format of the display,
+    so that blitting it there needs no conversion, or the surface
+    itself if it is in that format already or there is no display (as
+    in headless mode).
+
+    Surfaces with alpha are only converted to a display of 24 or 32
+    bits, blending them into a palette or 16 bit display from their own
+    format is faster"""
+    display = pygame.display.get_surface()
+    if display is None:
+        return surface
+    # A per-pixel alpha surface has an alpha mask (the flags do not
+    # tell it from a per-surface alpha one)
+    per_pixel_alpha = bool(surface.get_masks()[3])
+    alpha = surface.get_alpha()
+    if ((per_pixel_alpha or alpha is not None) and
+        display.get_bitsize() not in (24, 32)):
+        return surface
+    if per_pixel_alpha:
+        return surface.convert_alpha()
+    if (surface.get_bitsize() == display.get_bitsize() and
+        surface.get_masks() == display.get_masks()):
+        return surface
+    # Converting with the per-surface alpha would add an alpha
+    # channel, which is much slower to blit
+    surface.set_alpha(None)
+    converted = surface.convert()
+    surface.set_alpha(alpha)
+    converted.set_alpha(alpha)
+    return converted
@@ -1 +1 @@
-VERSION = '0.6'
+VERSION = '0.7'